@@ -20,6 +20,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -72,6 +73,43 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# ETags and cached lists are versioned in the cache, so every process
+# must share it: CACHE_LOCATION is the memcached server (host:port).
+# Without it each process keeps its own versions, which is only correct
+# for a single development process, check --deploy reports it
+
+if os.environ.get('CACHE_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': os.environ['CACHE_LOCATION'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+RECIPE_LIST_CACHE_TIMEOUT = 300
+
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+
+
+# Signed access tokens
+# When enabled the token endpoint issues short lived HMAC-signed access
+# tokens plus database backed refresh tokens, opaque tokens keep working
+
+AUTH_SIGNED_TOKENS = False
+
+AUTH_ACCESS_TOKEN_LIFETIME = 300
+
+AUTH_REFRESH_TOKEN_LIFETIME = 30 * 24 * 60 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -112,8 +150,98 @@ MEDIA_ROOT = '/vol/web/media'
 
 STATIC_ROOT = 'vol/web/static'
 
+# Widths of resized copies generated for uploaded recipe images,
+# by a pool of RECIPE_IMAGE_WORKERS threads
+
+RECIPE_IMAGE_RENDITIONS = (160, 480, 1080)
+
+RECIPE_IMAGE_WORKERS = 2
+
+# Uploaded recipe images are re-encoded to this format (JPEG, WEBP or PNG)
+# without metadata
+
+RECIPE_IMAGE_FORMAT = 'JPEG'
+
+RECIPE_IMAGE_QUALITY = 85
+
+# Name stored images after their SHA-256 so identical files are kept once,
+# files are deleted when no recipe references them anymore
+
+RECIPE_IMAGE_CONTENT_ADDRESSED = False
+
+# Limits checked before an uploaded image is decoded
+
+RECIPE_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+
+# Seconds a resumable image upload may take before it is discarded
+
+RECIPE_IMAGE_UPLOAD_LIFETIME = 24 * 60 * 60
+
+# Who sends media files once the view checked access: nginx
+# (X-Accel-Redirect to an internal location at MEDIA_ACCEL_REDIRECT_PREFIX),
+# apache (X-Sendfile) or django itself, which is meant for development
+
+MEDIA_SERVE_BACKEND = os.environ.get('MEDIA_SERVE_BACKEND', 'django')
+
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Text search configuration of recipe search vectors and queries
+
+RECIPE_SEARCH_CONFIG = 'english'
+
+# Default and maximum number of tag/ingredient autocomplete suggestions
+
+RECIPE_AUTOCOMPLETE_LIMIT = 10
+
+RECIPE_AUTOCOMPLETE_MAX_LIMIT = 50
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 AUTH_USER_MODEL = 'core.User'
+
+
+# REST framework
+# JSON is rendered and parsed with orjson, clients sending
+# Accept: application/msgpack (or ?format=msgpack) receive MessagePack.
+# Views can pick other renderers and parsers with renderer_classes and
+# parser_classes
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.ORJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Pagination
+# Lists are paginated with keyset cursors when ?cursor= or ?page_size= is sent
+
+RECIPE_PAGE_SIZE = 50
+
+RECIPE_MAX_PAGE_SIZE = 500
+
+# Largest JSON array accepted when bulk creating tags or ingredients
+
+RECIPE_BULK_CREATE_MAX = 1000
+
+# Recipes validated and inserted per batch by NDJSON imports
+
+RECIPE_IMPORT_CHUNK_SIZE = 500
+
+# Longest NDJSON import line in bytes, longer lines are reported as errors
+
+RECIPE_IMPORT_MAX_LINE_BYTES = 64 * 1024
+
+# Recipes fetched per round trip from the server side cursor by exports
+
+RECIPE_EXPORT_CHUNK_SIZE = 2000
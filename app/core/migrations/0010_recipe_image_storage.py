@@ -0,0 +1,20 @@
+# Generated by Django 3.2.9 on 2026-10-18 20:13
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, null=True, storage=core.storage.RecipeImageStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.9 on 2026-10-18 20:19
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_search_vector(apps, schema_editor):
+    #Same vector as recipe.search.search_vector_expression
+    Recipe = apps.get_model('core', 'Recipe')
+    config = settings.RECIPE_SEARCH_CONFIG
+    names = Recipe.ingredients.through.objects \
+        .filter(recipe=OuterRef('pk')) \
+        .values('recipe') \
+        .annotate(names=StringAgg('ingredient__name', ' ')) \
+        .values('names')
+
+    Recipe.objects.update(
+        search_vector=SearchVector('title', weight='A', config=config) +
+        SearchVector(
+            Coalesce(Subquery(names), Value('')),
+            weight='B',
+            config=config
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipeimageupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+from django.contrib.postgres.operations import BtreeGinExtension, \
+                                              TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        BtreeGinExtension(),
+        #Autocomplete matches UPPER(name) the way istartswith/icontains
+        #render it, user_id (through btree_gin) is part of the index so
+        #only the trigrams of one user are read
+        migrations.RunSQL(
+            'CREATE INDEX tag_user_name_trgm_idx ON core_tag '
+            'USING gin (user_id, UPPER(name) gin_trgm_ops);',
+            'DROP INDEX tag_user_name_trgm_idx;'
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX ingredient_user_name_trgm_idx ON core_ingredient '
+            'USING gin (user_id, UPPER(name) gin_trgm_ops);',
+            'DROP INDEX ingredient_user_name_trgm_idx;'
+        ),
+    ]
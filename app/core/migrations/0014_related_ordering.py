@@ -0,0 +1,21 @@
+# Generated by Django 3.2.9 on 2026-10-18 21:09
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_trigram_name_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredient',
+            options={'ordering': ('id',)},
+        ),
+        migrations.AlterModelOptions(
+            name='tag',
+            options={'ordering': ('id',)},
+        ),
+    ]
@@ -5,6 +5,10 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+
+from core.storage import RecipeImageStorage
 
 
 def recipe_image_file_path(instance, filename):
@@ -46,6 +50,18 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+class RefreshToken(models.Model):
+    #Long lived token exchanged for signed access tokens
+    #Only a digest of the key is stored, revoking means deleting the row
+    key_digest = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+
 class Tag(models.Model):
     #Tag to be used for a recipe
     name = models.CharField(max_length=255)
@@ -54,6 +70,13 @@ class Tag(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name'], name='tag_user_name_idx'),
+        ]
+        #recipe tags and ingredients render in the same order everywhere
+        ordering = ('id',)
+
     def __str__(self):
         return self.name
 
@@ -63,7 +86,15 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
-                             
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name'],
+                         name='ingredient_user_name_idx'),
+        ]
+        #recipe tags and ingredients render in the same order everywhere
+        ordering = ('id',)
+
     def __str__(self):
         return self.name
 
@@ -77,7 +108,37 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    #indexed for counting the recipes sharing a content addressed file
+    image = models.ImageField(null=True, upload_to=recipe_image_file_path,
+                              storage=RecipeImageStorage(), db_index=True)
+    #Resized copies of image, maps width to file name
+    image_renditions = models.JSONField(default=dict, blank=True)
+    #Changes on every write, including tag and ingredient assignments
+    updated_at = models.DateTimeField(auto_now=True)
+    #Title and ingredient names, maintained by recipe.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+            GinIndex(fields=['search_vector'],
+                     name='recipe_search_vector_idx'),
+        ]
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class RecipeImageUpload(models.Model):
+    #Resumable image upload, chunks are appended to a temporary file
+    #until received reaches size and the upload is completed
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4,
+                          editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
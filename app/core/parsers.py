@@ -0,0 +1,26 @@
+import codecs
+
+import orjson
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from core.renderers import ORJSONRenderer
+
+
+class ORJSONParser(parsers.JSONParser):
+    #JSONParser decoding UTF-8 bodies with orjson, other encodings are
+    #still decoded by the json module
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            #orjson rejects NaN and Infinity like the strict json parser
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+import msgpack
+import orjson
+from rest_framework import renderers
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+
+_encoder = encoders.JSONEncoder()
+
+#orjson leaves datetimes to default() so they are written like DRF does,
+#with Z for UTC, and converts integer keys like json.dumps
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def encode_default(obj):
+    #Convert what orjson and msgpack can not encode (lazy translations,
+    #dates, UUIDs, querysets) the way DRF's JSON encoder does
+    if isinstance(obj, Decimal):
+        #serializers render decimals as strings too unless configured not to
+        if api_settings.COERCE_DECIMAL_TO_STRING:
+            return str(obj)
+        return float(obj)
+
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    #JSONRenderer producing the same compact output with orjson,
+    #indented or ASCII only output is still written by the json module
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+
+        #escaped like JSONRenderer does, keeping the output valid javascript
+        return ret.replace('\u2028'.encode(), b'\\u2028') \
+                  .replace('\u2029'.encode(), b'\\u2029')
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    #MessagePack for clients sending Accept: application/msgpack
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=encode_default)
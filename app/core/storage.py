@@ -0,0 +1,69 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+from django.utils.deconstruct import deconstructible
+
+
+def lock_name(name):
+    #Lock a stored name until the current transaction ends, a save reusing
+    #a content addressed file and the release of that file wait for each
+    #other, so the file is never deleted under an uncommitted reference
+    key = int.from_bytes(
+        hashlib.sha256(name.encode()).digest()[:8],
+        'big',
+        signed=True
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [key])
+
+
+@deconstructible
+class RecipeImageStorage(FileSystemStorage):
+    #File system storage that, with RECIPE_IMAGE_CONTENT_ADDRESSED on,
+    #names files after the SHA-256 of their content so identical uploads
+    #are stored once. Save inside the transaction that stores the
+    #reference, the lock on the name is held until it commits
+
+    def get_available_name(self, name, max_length=None):
+        if settings.RECIPE_IMAGE_CONTENT_ADDRESSED:
+            #the final name is only known once the content is hashed
+            return name
+
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if not settings.RECIPE_IMAGE_CONTENT_ADDRESSED:
+            return super()._save(name, content)
+
+        directory = os.path.dirname(name)
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+
+        #hash while streaming to a temporary file in the target directory
+        fd, tmp_path = tempfile.mkstemp(dir=self.path(directory),
+                                        suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+
+            ext = os.path.splitext(name)[1]
+            name = os.path.join(directory, digest.hexdigest() + ext)
+            lock_name(name.replace('\\', '/'))
+            if self.exists(name):
+                os.remove(tmp_path)
+            else:
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                os.replace(tmp_path, self.path(name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return name.replace('\\', '/')
@@ -0,0 +1,135 @@
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import BytesIO
+
+import msgpack
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer, MessagePackRenderer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+SAMPLE_DATA = OrderedDict([
+    ('id', 1),
+    ('title', 'Crème brûlée\u2028'),
+    ('price', '5.50'),
+    ('created', datetime(2021, 11, 20, 12, 30, 15, 123456,
+                         tzinfo=timezone.utc)),
+    ('upload', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+    ('error', gettext_lazy('This field is required.')),
+    ('renditions', {160: 'http://testserver/media/pizza-160.jpg'}),
+    ('tags', [1, 2, 3]),
+])
+
+
+class ORJSONRendererTests(TestCase):
+    #Test the orjson renderer writes what JSONRenderer writes
+
+    def test_render_like_json_renderer(self):
+        #Test compact output is byte for byte the same
+        self.assertEqual(
+            ORJSONRenderer().render(SAMPLE_DATA),
+            JSONRenderer().render(SAMPLE_DATA)
+        )
+
+    def test_render_indented(self):
+        #Test indented output, e.g. of the browsable API, is the same
+        self.assertEqual(
+            ORJSONRenderer().render(SAMPLE_DATA, 'application/json; indent=4'),
+            JSONRenderer().render(SAMPLE_DATA, 'application/json; indent=4')
+        )
+
+    def test_render_decimal_as_string(self):
+        #Test decimals keep their digits instead of becoming floats
+        self.assertEqual(
+            ORJSONRenderer().render({'price': Decimal('0.10')}),
+            b'{"price":"0.10"}'
+        )
+
+    def test_parse(self):
+        #Test UTF-8 bodies are parsed and invalid ones rejected
+        parser = ORJSONParser()
+
+        self.assertEqual(
+            parser.parse(BytesIO('{"title": "Crème"}'.encode())),
+            {'title': 'Crème'}
+        )
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b'{"price": NaN}'))
+
+    def test_parse_other_encoding(self):
+        #Test bodies in other charsets are still decoded
+        data = ORJSONParser().parse(
+            BytesIO('{"title": "Crème"}'.encode('latin-1')),
+            parser_context={'encoding': 'latin-1'}
+        )
+
+        self.assertEqual(data, {'title': 'Crème'})
+
+
+class MessagePackRendererTests(TestCase):
+    #Test MessagePack rendering and its negotiation
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'msgpack@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_render(self):
+        #Test values are converted like for JSON
+        data = msgpack.unpackb(
+            MessagePackRenderer().render(SAMPLE_DATA),
+            strict_map_key=False
+        )
+
+        self.assertEqual(data['created'], '2021-11-20T12:30:15.123456Z')
+        self.assertEqual(data['upload'], str(SAMPLE_DATA['upload']))
+        self.assertEqual(data['error'], 'This field is required.')
+        self.assertEqual(data['tags'], [1, 2, 3])
+
+    @override_settings(MEDIA_URL='/media/')
+    def test_recipe_list_as_msgpack(self):
+        #Test clients asking for MessagePack get the same recipes as JSON
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pizza',
+            time_minutes=30,
+            price=Decimal('5.5'),
+            image='uploads/recipe/pizza.jpg'
+        )
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'fields': 'title,price'},
+            HTTP_ACCEPT='application/msgpack'
+        )
+
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            msgpack.unpackb(res.content),
+            [{'title': 'Pizza', 'price': '5.50'}]
+        )
+
+        res = self.client.get(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            {'format': 'msgpack', 'fields': 'image'}
+        )
+
+        self.assertEqual(
+            msgpack.unpackb(res.content),
+            {'image': 'http://testserver/media/uploads/recipe/pizza.jpg'}
+        )
@@ -0,0 +1,82 @@
+import hashlib
+import uuid
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+#Cached data is never deleted key by key, every user has a version
+#per scope that is part of the keys, and a write moves it to a new one
+
+#Scope of everything rendered by RecipeViewSet
+RECIPES_SCOPE = 'recipes'
+
+
+def _version_key(scope, user_id):
+    return f'recipe:{scope}:version:{user_id}'
+
+
+def user_version(scope, user_id):
+    #Return the current version of a user's cached data
+    key = _version_key(scope, user_id)
+    version = cache.get(key)
+
+    if version is None:
+        #A lost version is replaced by a new one, never reused
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+
+    return version
+
+
+def _set_version(scope, user_id):
+    cache.set(_version_key(scope, user_id), uuid.uuid4().hex, None)
+
+
+def bump_user_version(scope, user_id):
+    #Invalidate everything cached for a user in the given scope once the
+    #write commits, before that a concurrent request could still read the
+    #old rows and cache them under the new version
+    transaction.on_commit(partial(_set_version, scope, user_id))
+
+
+def _query_params(request):
+    return sorted(
+        (key, value) for key, values in request.query_params.lists()
+        for value in values
+    )
+
+
+def _digest(*parts):
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def etag(request, *version):
+    #Strong ETag for a version of the data and the request shaping the body
+    digest = _digest(
+        version,
+        request.get_host(),
+        _query_params(request),
+        request.accepted_media_type
+    )
+
+    return f'"{digest}"'
+
+
+def list_cache_key(scope, request):
+    #Key for a list response of the user, its query params and host,
+    #computed once before the query so a bump while it runs is not missed
+    digest = _digest(request.get_host(), _query_params(request))
+    version = user_version(scope, request.user.pk)
+
+    return f'recipe:{scope}:list:{request.user.pk}:{version}:{digest}'
+
+
+def get_list(key):
+    return cache.get(key)
+
+
+def set_list(key, data):
+    cache.set(key, data, settings.RECIPE_LIST_CACHE_TIMEOUT)
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+#Backends keeping a separate cache in every process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    #Cache versions behind ETags and cached lists must be seen by every
+    #process, a write on one worker would not invalidate the others
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+        return [Error(
+            'The default cache is local to each process, other processes '
+            'keep serving recipe data that changed.',
+            hint='Set CACHE_LOCATION to a shared memcached server.',
+            id='recipe.E001',
+        )]
+
+    return []
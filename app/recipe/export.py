@@ -0,0 +1,83 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import renderers
+
+from core.models import Recipe
+from recipe.related import related_ids
+
+
+#Same fields and order as RecipeSerializer
+EXPORT_FIELDS = ('id', 'title', 'ingredients', 'tags',
+                 'time_minutes', 'price', 'link')
+
+
+def recipe_rows(user, chunk_size):
+    #Yield all recipes of the user as dicts, reading through a server
+    #side cursor and attaching related ids one chunk at a time
+    rows = Recipe.objects.filter(user=user).order_by('id').values(
+        'id', 'title', 'time_minutes', 'price', 'link'
+    ).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        ids = [row['id'] for row in chunk]
+        ingredients = related_ids('ingredients', ids)
+        tags = related_ids('tags', ids)
+        for row in chunk:
+            row['ingredients'] = ingredients.get(row['id'], [])
+            row['tags'] = tags.get(row['id'], [])
+            yield {field: row[field] for field in EXPORT_FIELDS}
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    #Renderer writing one JSON document per line
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render_rows(self, rows, fields):
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        #Used for error responses of streaming views
+        rows = data if isinstance(data, list) else [data]
+
+        return ''.join(self.render_rows(rows, None)).encode(self.charset)
+
+
+class _Echo:
+    #File-like object returning what is written, for streaming csv rows
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    #Renderer writing a header and one line per row,
+    #lists are written as space separated values
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render_rows(self, rows, fields):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([
+                ' '.join(str(value) for value in row[field])
+                if isinstance(row[field], list) else row[field]
+                for field in fields
+            ])
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        #Used for error responses of streaming views
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows else []
+
+        return ''.join(self.render_rows(rows, fields)).encode(self.charset)
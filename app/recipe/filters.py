@@ -0,0 +1,45 @@
+from django.db.models import Exists, OuterRef
+
+from core.models import Recipe
+
+
+#Query param suffix for each way of matching related ids,
+#a bare ?tags= keeps its original any-of meaning
+MATCH_MODES = ('any', 'all', 'none')
+
+
+def relation_params(field_name):
+    #Return (mode, query param) pairs accepted for a recipe relation
+    yield 'any', field_name
+    for mode in MATCH_MODES:
+        yield mode, f'{field_name}__{mode}'
+
+
+def _related_exists(field_name, ids):
+    #Correlated EXISTS over the relation through table
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through
+
+    return Exists(through.objects.filter(**{
+        field.m2m_field_name(): OuterRef('pk'),
+        f'{field.m2m_reverse_field_name()}__in': ids
+    }))
+
+
+def filter_related(queryset, field_name, mode, ids):
+    #Filter recipes by related ids without joining the through table,
+    #so every recipe is returned once and no DISTINCT is needed
+    if mode == 'any':
+        return queryset.filter(_related_exists(field_name, ids))
+
+    if mode == 'none':
+        return queryset.filter(~_related_exists(field_name, ids))
+
+    if mode == 'all':
+        for related_id in set(ids):
+            queryset = queryset.filter(
+                _related_exists(field_name, [related_id])
+            )
+        return queryset
+
+    raise ValueError(f'Unknown match mode: {mode}')
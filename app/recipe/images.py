@@ -0,0 +1,219 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.models import Recipe
+from core.storage import lock_name
+from recipe import metrics
+from recipe.caching import RECIPES_SCOPE, bump_user_version
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+#File extension and encoder options of each output format
+FORMATS = {
+    'JPEG': ('jpg', {'progressive': True, 'optimize': True}),
+    'WEBP': ('webp', {'method': 6}),
+    'PNG': ('png', {'optimize': True}),
+}
+
+
+def executor():
+    #Worker pool generating renditions off the request thread
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGE_WORKERS,
+            thread_name_prefix='recipe-renditions'
+        )
+
+    return _executor
+
+
+def rendition_name(name, width):
+    #uploads/recipe/<name>.jpg -> uploads/recipe/renditions/<name>-160.jpg
+    directory, filename = os.path.split(name)
+    stem, ext = os.path.splitext(filename)
+
+    return os.path.join(directory, 'renditions', f'{stem}-{width}{ext}')
+
+
+def _resized(image, width, image_format):
+    #Encode a copy of image scaled down to width
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.LANCZOS)
+    if image_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+        resized = resized.convert('RGB')
+
+    content = BytesIO()
+    resized.save(content, format=image_format)
+
+    return ContentFile(content.getvalue())
+
+
+INVALID_IMAGE = (
+    'Upload a valid image. The file you uploaded was either not an image '
+    'or a corrupted image.'
+)
+
+
+def check_size(size):
+    if size > settings.RECIPE_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            f'Image is larger than {settings.RECIPE_IMAGE_MAX_BYTES} bytes.'
+        )
+
+
+def check_dimensions(image):
+    #Image.open only reads the header, reject huge images before decoding
+    if image.width * image.height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Image has more than {settings.RECIPE_IMAGE_MAX_PIXELS} pixels.'
+        )
+
+
+def recompress(upload):
+    #Decode an upload once, apply its EXIF orientation, drop metadata
+    #and re-encode it to RECIPE_IMAGE_FORMAT, returns the new file
+    image_format = settings.RECIPE_IMAGE_FORMAT
+    extension, options = FORMATS[image_format]
+
+    check_size(upload.size)
+    upload.seek(0)
+    try:
+        with Image.open(upload) as original:
+            check_dimensions(original)
+            image = ImageOps.exif_transpose(original)
+            #keep the colour profile, everything else (EXIF, GPS, comments)
+            #is dropped so no encoder can copy it over
+            icc_profile = original.info.get('icc_profile')
+            image.info = {}
+
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        if icc_profile:
+            options = dict(options, icc_profile=icc_profile)
+
+        content = BytesIO()
+        image.save(
+            content,
+            format=image_format,
+            quality=settings.RECIPE_IMAGE_QUALITY,
+            **options
+        )
+    except OSError:
+        #headers can be intact while the pixel data is cut off
+        raise ValidationError(INVALID_IMAGE)
+    #both sides are counted, re-encoding small or already optimized
+    #images can make them bigger
+    metrics.incr('recipe_image_bytes_uploaded', upload.size)
+    metrics.incr('recipe_image_bytes_stored', content.tell())
+
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+
+    return ContentFile(content.getvalue(), name=f'{stem}.{extension}')
+
+
+def generate_renditions(recipe_id):
+    #Write resized copies of a recipe image and record them on the recipe
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image', 'user').first()
+    if recipe is None or not recipe.image:
+        return {}
+
+    name = recipe.image.name
+    storage = recipe.image.storage
+    resized = []
+    with recipe.image.open('rb') as image_file, \
+            Image.open(image_file) as image:
+        image_format = image.format
+        for width in settings.RECIPE_IMAGE_RENDITIONS:
+            if width >= image.width:
+                #never upscale, clients fall back to the original
+                continue
+
+            resized.append((width, _resized(image, width, image_format)))
+
+    #saved in the transaction recording them, content addressed
+    #renditions may be shared and are locked until they are referenced
+    with transaction.atomic():
+        renditions = {}
+        for width, content in resized:
+            path = rendition_name(name, width)
+            storage.delete(path)
+            renditions[str(width)] = storage.save(path, content)
+
+        #the image may have been replaced while we were working, queryset
+        #updates leave updated_at alone, it is moved for the detail ETag
+        if not Recipe.objects.filter(pk=recipe_id, image=name).update(
+            image_renditions=renditions,
+            updated_at=timezone.now()
+        ):
+            _release_renditions(storage, renditions)
+            return {}
+
+        bump_user_version(RECIPES_SCOPE, recipe.user_id)
+
+    return renditions
+
+
+def _release_renditions(storage, renditions):
+    #Delete renditions no recipe records anymore, different originals
+    #can scale down to identical, and so shared, content addressed files
+    for width in sorted(renditions, key=int):
+        path = renditions[width]
+        lock_name(path)
+        if not Recipe.objects.filter(
+            image_renditions__contains={width: path}
+        ).exists():
+            storage.delete(path)
+
+
+def release_image(name, renditions):
+    #Delete an image file and its renditions unless another recipe still
+    #uses them, identical uploads share a file in content addressed mode
+    if not name:
+        return
+
+    storage = Recipe._meta.get_field('image').storage
+    with transaction.atomic():
+        #waits for uploads reusing the file to commit their reference
+        lock_name(name)
+        if not Recipe.objects.filter(image=name).exists():
+            storage.delete(name)
+        _release_renditions(storage, renditions)
+
+
+def schedule_release(name, renditions):
+    #Release an image once the change dropping it is committed
+    transaction.on_commit(partial(release_image, name, dict(renditions)))
+
+
+def _generate_in_worker(recipe_id):
+    try:
+        generate_renditions(recipe_id)
+    except Exception:
+        logger.exception('Generating renditions of recipe %s failed',
+                         recipe_id)
+    finally:
+        #worker threads own their database connection
+        connection.close()
+
+
+def submit_renditions(recipe_id):
+    return executor().submit(_generate_in_worker, recipe_id)
+
+
+def schedule_renditions(recipe):
+    #Generate renditions in the worker pool once the upload is committed
+    transaction.on_commit(partial(submit_renditions, recipe.pk))
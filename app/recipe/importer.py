@@ -0,0 +1,187 @@
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.caching import RECIPES_SCOPE, bump_user_version
+from recipe.search import update_search_vector
+
+
+#Recipe relations written straight to their through tables
+RELATED_MODELS = {
+    'tags': Tag,
+    'ingredients': Ingredient,
+}
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    #Serializer validating one imported recipe,
+    #related ids are checked for the whole chunk at once
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ('title', 'ingredients', 'tags',
+                  'time_minutes', 'price', 'link')
+
+
+def read_lines(stream, limit=None):
+    #Yield the lines of a binary stream, reading at most limit bytes at a
+    #time, a longer line is skipped and yielded as None
+    limit = limit or settings.RECIPE_IMPORT_MAX_LINE_BYTES
+    if stream is None:
+        return
+
+    while True:
+        line = stream.readline(limit + 1)
+        if not line:
+            return
+        if len(line) <= limit or line.endswith(b'\n'):
+            yield line
+            continue
+
+        while line and not line.endswith(b'\n'):
+            line = stream.readline(limit + 1)
+        yield None
+
+
+def _numbered_chunks(lines, size):
+    #Yield lists of (line number, line) without reading ahead
+    numbered = enumerate(lines, start=1)
+    while True:
+        chunk = list(islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse_chunk(chunk):
+    #Return validated recipes and errors for lines of a chunk
+    rows = []
+    errors = []
+    for number, line in chunk:
+        if line is None:
+            errors.append({'line': number, 'errors': {
+                'non_field_errors': [
+                    'Line is longer than '
+                    f'{settings.RECIPE_IMPORT_MAX_LINE_BYTES} bytes.'
+                ]
+            }})
+            continue
+        if not line.strip():
+            continue
+
+        try:
+            data = json.loads(line)
+        except ValueError:
+            errors.append({'line': number, 'errors': {
+                'non_field_errors': ['Line is not valid JSON.']
+            }})
+            continue
+
+        serializer = RecipeImportSerializer(data=data)
+        if serializer.is_valid():
+            rows.append((number, serializer.validated_data))
+        else:
+            errors.append({'line': number, 'errors': serializer.errors})
+
+    return rows, errors
+
+
+def _check_related(user, rows):
+    #Drop recipes pointing at tags or ingredients the user does not own,
+    #with one query per relation for the whole chunk
+    owned = {}
+    for field_name, model in RELATED_MODELS.items():
+        ids = {pk for number, data in rows for pk in data.get(field_name, ())}
+        owned[field_name] = set(
+            model.objects.filter(user=user, id__in=ids)
+                         .values_list('id', flat=True)
+        ) if ids else set()
+
+    valid = []
+    errors = []
+    for number, data in rows:
+        missing = {
+            field_name: [
+                f'Invalid pk "{pk}" - object does not exist.'
+                for pk in data.get(field_name, ())
+                if pk not in owned[field_name]
+            ]
+            for field_name in RELATED_MODELS
+        }
+        missing = {key: value for key, value in missing.items() if value}
+        if missing:
+            errors.append({'line': number, 'errors': missing})
+        else:
+            valid.append(data)
+
+    return valid, errors
+
+
+def _insert(user, valid):
+    #Insert recipes and their assignments with one query per table
+    with transaction.atomic():
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=user, **{
+                key: value for key, value in data.items()
+                if key not in RELATED_MODELS
+            })
+            for data in valid
+        )
+
+        for field_name in RELATED_MODELS:
+            field = Recipe._meta.get_field(field_name)
+            through = field.remote_field.through
+            through.objects.bulk_create(
+                through(**{
+                    f'{field.m2m_field_name()}_id': recipe.pk,
+                    f'{field.m2m_reverse_field_name()}_id': pk
+                })
+                for recipe, data in zip(recipes, valid)
+                for pk in dict.fromkeys(data.get(field_name, ()))
+            )
+
+        update_search_vector([recipe.pk for recipe in recipes])
+
+    return recipes
+
+
+def import_recipes(user, lines, chunk_size=None):
+    #Import newline delimited JSON recipes for the user chunk by chunk,
+    #yield the errors of each failed line as its chunk is done and then
+    #a summary, so nothing grows with the size of the upload
+    chunk_size = chunk_size or settings.RECIPE_IMPORT_CHUNK_SIZE
+    created = 0
+    failed = 0
+
+    try:
+        for chunk in _numbered_chunks(lines, chunk_size):
+            rows, parse_errors = _parse_chunk(chunk)
+            valid, related_errors = _check_related(user, rows)
+            errors = sorted(
+                parse_errors + related_errors,
+                key=lambda error: error['line']
+            )
+            if valid:
+                created += len(_insert(user, valid))
+            failed += len(errors)
+            yield from errors
+
+        yield {'created': created, 'failed': failed}
+    finally:
+        if created:
+            #bulk inserts send no signals, invalidate cached data here,
+            #also when the client stops reading the report halfway
+            for scope in (RECIPES_SCOPE,) + tuple(RELATED_MODELS):
+                bump_user_version(scope, user.pk)
@@ -0,0 +1,118 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Recipe, Tag, Ingredient
+
+
+class BenchmarkCommand(BaseCommand):
+    #Base command timing code against a seeded throwaway dataset
+    #Everything is created inside a transaction that is rolled back
+    default_recipes = 10000
+    default_tags = 50
+    default_ingredients = 500
+    batch_size = 5000
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int,
+                            default=self.default_recipes)
+        parser.add_argument('--tags', type=int, default=self.default_tags)
+        parser.add_argument('--ingredients', type=int,
+                            default=self.default_ingredients)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+
+        with transaction.atomic():
+            self.stdout.write(f'Seeding {options["recipes"]} recipes...')
+            user = self.seed(
+                options['recipes'],
+                options['tags'],
+                options['ingredients']
+            )
+            self.benchmark(user, **options)
+            transaction.set_rollback(True)
+
+    def benchmark(self, user, **options):
+        #Run and report the timings, implemented by subclasses
+        raise NotImplementedError
+
+    def seed(self, recipes, tags, ingredients):
+        #Create a user owning random recipes, tags and ingredients
+        user = get_user_model().objects.create_user(
+            f'benchmark-{uuid.uuid4()}@djangoproject.com',
+            'benchmark'
+        )
+        tag_ids = [tag.id for tag in Tag.objects.bulk_create(
+            Tag(user=user, name=f'Tag {i}') for i in range(tags)
+        )]
+        ingredient_ids = [ingredient.id for ingredient in
+                          Ingredient.objects.bulk_create(
+                              Ingredient(user=user, name=f'Ingredient {i}')
+                              for i in range(ingredients)
+                          )]
+
+        for start in range(0, recipes, self.batch_size):
+            count = min(self.batch_size, recipes - start)
+            batch = Recipe.objects.bulk_create(
+                self.sample_recipe(user, start + i) for i in range(count)
+            )
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe in batch
+                for tag_id in random.sample(tag_ids, min(3, len(tag_ids)))
+            )
+            Recipe.ingredients.through.objects.bulk_create(
+                Recipe.ingredients.through(
+                    recipe_id=recipe.id,
+                    ingredient_id=ingredient_id
+                )
+                for recipe in batch
+                for ingredient_id in random.sample(
+                    ingredient_ids,
+                    min(8, len(ingredient_ids))
+                )
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        return user
+
+    def sample_recipe(self, user, number):
+        #Unsaved recipe used when seeding
+        return Recipe(
+            user=user,
+            title=f'Recipe {number}',
+            time_minutes=random.randint(5, 240),
+            price=random.randint(100, 9999) / 100
+        )
+
+    def timeit(self, label, func, repeat):
+        #Time repeated calls of func and print a summary line
+        func()
+        timings = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+
+        def percentile(fraction):
+            return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+        self.stdout.write(
+            f'{label:<40} median {statistics.median(timings):8.2f} ms'
+            f'   p95 {percentile(0.95):8.2f} ms'
+            f'   p99 {percentile(0.99):8.2f} ms'
+        )
+
+        return timings
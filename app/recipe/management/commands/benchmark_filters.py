@@ -0,0 +1,49 @@
+import random
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import filters
+from recipe.management.commands._benchmark import BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    #Compare join based recipe filtering with the EXISTS filters
+    help = 'Benchmark join and EXISTS based tag/ingredient filtering'
+
+    def benchmark(self, user, **options):
+        repeat = options['repeat']
+        recipes = Recipe.objects.filter(user=user).order_by('id')
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(user=user).values_list('id', flat=True)
+        )
+        tags = random.sample(tag_ids, min(3, len(tag_ids)))
+        ingredients = random.sample(ingredient_ids, min(3, len(ingredient_ids)))
+
+        def run(queryset):
+            return lambda: list(queryset.values_list('id', flat=True))
+
+        cases = (
+            ('join any-of tags', recipes.filter(tags__id__in=tags)),
+            ('join any-of tags + DISTINCT',
+             recipes.filter(tags__id__in=tags).distinct()),
+            ('exists any-of tags',
+             filters.filter_related(recipes, 'tags', 'any', tags)),
+            ('exists all-of tags',
+             filters.filter_related(recipes, 'tags', 'all', tags[:2])),
+            ('exists none-of tags',
+             filters.filter_related(recipes, 'tags', 'none', tags)),
+            ('join tags + ingredients',
+             recipes.filter(tags__id__in=tags)
+                    .filter(ingredients__id__in=ingredients)),
+            ('exists tags + ingredients',
+             filters.filter_related(
+                 filters.filter_related(recipes, 'tags', 'any', tags),
+                 'ingredients', 'any', ingredients
+             )),
+        )
+
+        for label, queryset in cases:
+            rows = len(run(queryset)())
+            self.timeit(f'{label} ({rows} rows)', run(queryset), repeat)
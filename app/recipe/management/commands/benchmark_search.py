@@ -0,0 +1,76 @@
+import random
+
+from django.db import connection
+from django.db.models import Q
+
+from core.models import Recipe, Ingredient
+from recipe import search
+from recipe.management.commands._benchmark import BenchmarkCommand
+
+
+#Words recipe titles and ingredient names are made of
+WORDS = (
+    'tomato', 'basil', 'garlic', 'onion', 'chicken', 'beef', 'lentil',
+    'rice', 'noodle', 'curry', 'soup', 'salad', 'stew', 'roast', 'pie',
+    'lemon', 'ginger', 'chili', 'mushroom', 'spinach', 'potato', 'cheese',
+    'butter', 'honey', 'almond', 'coconut', 'pepper', 'salmon', 'tofu',
+    'bean', 'pasta', 'bread', 'apple', 'pear', 'cinnamon', 'vanilla',
+)
+
+
+class Command(BenchmarkCommand):
+    #Compare ILIKE scans with the ranked full text search
+    help = 'Benchmark recipe full text search on a seeded dataset'
+    default_recipes = 1000000
+
+    def sample_recipe(self, user, number):
+        recipe = super().sample_recipe(user, number)
+        recipe.title = ' '.join(random.sample(WORDS, 3)).capitalize()
+
+        return recipe
+
+    def seed(self, recipes, tags, ingredients):
+        user = super().seed(recipes, tags, ingredients)
+
+        self.stdout.write('Naming ingredients and indexing...')
+        renamed = list(Ingredient.objects.filter(user=user))
+        for ingredient in renamed:
+            ingredient.name = ' '.join(random.sample(WORDS, 2))
+        Ingredient.objects.bulk_update(renamed, ['name'], self.batch_size)
+
+        recipe_ids = list(
+            Recipe.objects.filter(user=user).values_list('id', flat=True)
+        )
+        for start in range(0, len(recipe_ids), self.batch_size):
+            search.update_search_vector(
+                recipe_ids[start:start + self.batch_size]
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_recipe')
+
+        return user
+
+    def benchmark(self, user, **options):
+        repeat = options['repeat']
+        recipes = Recipe.objects.filter(user=user).order_by('id')
+
+        def run(queryset, limit=50):
+            return lambda: list(queryset.values_list('id', flat=True)[:limit])
+
+        cases = (
+            ('ILIKE title', recipes.filter(title__icontains='curry')),
+            ('ILIKE title or ingredient',
+             recipes.filter(
+                 Q(title__icontains='curry') |
+                 Q(ingredients__name__icontains='curry')
+             ).distinct()),
+            ('search one word', search.search(recipes, 'curry')),
+            ('search two words', search.search(recipes, 'curry lentil')),
+            ('search phrase', search.search(recipes, '"lentil curry"')),
+            ('search with exclusion',
+             search.search(recipes, 'curry -chicken')),
+        )
+
+        for label, queryset in cases:
+            self.timeit(f'{label} (first 50)', run(queryset), repeat)
@@ -0,0 +1,65 @@
+from django.db.models import Prefetch
+from django.test import RequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import rows
+from recipe.management.commands._benchmark import BenchmarkCommand
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+class Command(BenchmarkCommand):
+    #Compare rendering recipes with the serializers and from values() rows
+    help = 'Benchmark serializer and values() based recipe rendering'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--page-size', type=int, default=1000)
+
+    def benchmark(self, user, **options):
+        repeat = options['repeat']
+        recipes = Recipe.objects.filter(user=user).order_by('id')
+        ids = list(
+            recipes.values_list('id', flat=True)[:options['page_size']]
+        )
+        page = recipes.filter(id__in=ids)
+        context = {'request': RequestFactory().get('/api/recipe/recipes/')}
+
+        def serialized(serializer_class, *lookups):
+            def run():
+                return serializer_class(
+                    page.prefetch_related(*lookups),
+                    many=True,
+                    context=context
+                ).data
+            return run
+
+        def rendered(serializer_class):
+            serializer = serializer_class(context=context)
+
+            def run():
+                return rows.render(
+                    serializer,
+                    page.values(*rows.columns(serializer))
+                )
+            return run
+
+        cases = (
+            ('list serializer', serialized(
+                RecipeSerializer,
+                Prefetch('tags', queryset=Tag.objects.only('id')),
+                Prefetch('ingredients', queryset=Ingredient.objects.only('id'))
+            )),
+            ('list rows', rendered(RecipeSerializer)),
+            ('detail serializer', serialized(
+                RecipeDetailSerializer,
+                Prefetch('tags', queryset=Tag.objects.only('id', 'name')),
+                Prefetch(
+                    'ingredients',
+                    queryset=Ingredient.objects.only('id', 'name')
+                )
+            )),
+            ('detail rows', rendered(RecipeDetailSerializer)),
+        )
+
+        for label, run in cases:
+            self.timeit(f'{label} ({len(ids)} recipes)', run, repeat)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from recipe.uploads import discard_expired, discard_orphaned_parts
+
+
+class Command(BaseCommand):
+    #Django command deleting abandoned image uploads of every user,
+    #meant to be run periodically, e.g. hourly from cron
+    help = 'Delete expired recipe image uploads and their temporary files'
+
+    def handle(self, *args, **options):
+        uploads = discard_expired()
+        parts = discard_orphaned_parts()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Discarded {uploads} expired uploads, {parts} orphaned files'
+        ))
@@ -0,0 +1,49 @@
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importer import import_recipes, read_lines
+
+
+class Command(BaseCommand):
+    #Django command importing newline delimited JSON recipes for a user
+    help = 'Import NDJSON recipes from a file (or - for stdin) for a user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+
+        if options['path'] == '-':
+            self._report(import_recipes(
+                user,
+                read_lines(sys.stdin.buffer),
+                options['chunk_size']
+            ))
+        else:
+            with open(options['path'], 'rb') as lines:
+                self._report(import_recipes(
+                    user,
+                    read_lines(lines),
+                    options['chunk_size']
+                ))
+
+    def _report(self, report):
+        #Write line errors as they come, then the summary
+        for row in report:
+            if 'line' in row:
+                self.stderr.write(json.dumps(row))
+                continue
+
+            self.stdout.write(self.style.SUCCESS(
+                f'Imported {row["created"]} recipes, '
+                f'{row["failed"]} lines failed'
+            ))
@@ -0,0 +1,131 @@
+import mimetypes
+import re
+from functools import reduce
+from operator import or_
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, \
+                        StreamingHttpResponse
+from rest_framework import status
+
+from core.models import Recipe
+
+
+#Stored names are unique (uuid4 or the content hash) and never rewritten,
+#so browsers may keep a file for a year without revalidating it
+CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+#Bytes read from the file at a time for partial responses
+BLOCK_SIZE = 64 * 1024
+
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def owned_by(user, name):
+    #Whether one of the user's recipes uses the file as image or rendition
+    rendition_of = [
+        Q(image_renditions__contains={str(width): name})
+        for width in settings.RECIPE_IMAGE_RENDITIONS
+    ]
+
+    return Recipe.objects.filter(user=user) \
+                         .filter(reduce(or_, rendition_of, Q(image=name))) \
+                         .exists()
+
+
+def byte_range(header, size):
+    #Return (start, end) of a single byte range, None for the whole file,
+    #multiple or malformed ranges are ignored like the spec allows
+    match = BYTE_RANGE.match(header or '')
+    if match is None or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        #suffix range, the last bytes of the file
+        if not int(last):
+            raise RangeNotSatisfiable()
+        return max(0, size - int(last)), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+
+    return start, end
+
+
+def _read_range(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            block = file.read(min(BLOCK_SIZE, length))
+            if not block:
+                return
+            length -= len(block)
+            yield block
+
+
+def _serve_from_django(request, storage, name, content_type):
+    #Development fallback, ties up a worker for the whole transfer
+    try:
+        file = storage.open(name, 'rb')
+    except FileNotFoundError:
+        raise Http404()
+
+    size = storage.size(name)
+    try:
+        requested = byte_range(request.headers.get('Range'), size)
+    except RangeNotSatisfiable:
+        file.close()
+        response = HttpResponse(
+            status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if requested is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = requested
+        response = StreamingHttpResponse(
+            _read_range(file, start, end - start + 1),
+            status=status.HTTP_206_PARTIAL_CONTENT,
+            content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+
+    return response
+
+
+def serve(request, storage, name):
+    #Respond with a stored file, handing the transfer (including range
+    #requests) to the front end server unless MEDIA_SERVE_BACKEND is django
+    content_type = mimetypes.guess_type(name)[0] or \
+        'application/octet-stream'
+    backend = settings.MEDIA_SERVE_BACKEND
+
+    if backend == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = \
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+    elif backend == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = storage.path(name)
+    else:
+        response = _serve_from_django(request, storage, name, content_type)
+
+    response['Cache-Control'] = CACHE_CONTROL
+
+    return response
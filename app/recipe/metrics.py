@@ -0,0 +1,35 @@
+import logging
+
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+
+def _key(name):
+    return f'metrics:{name}'
+
+
+#Counters live in the default cache, they are lost when evicted or when
+#the cache restarts and only show recent activity. Every increment is
+#logged, totals over any period are summed from those log lines
+
+def incr(name, value=1):
+    #Add value to a counter kept in the default cache, counters only grow,
+    #memcached would floor a decrement at 0 instead of going negative
+    if value < 0:
+        raise ValueError(f'metric {name} can not be decremented')
+
+    key = _key(name)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        #evicted between add and incr
+        cache.set(key, value, None)
+    logger.info('metric %s += %s', name, value)
+
+
+def get(name):
+    #Return the current value of a counter
+    return cache.get(_key(name), 0)
@@ -0,0 +1,29 @@
+from django.conf import settings
+from rest_framework import pagination
+
+
+class RecipeCursorPagination(pagination.CursorPagination):
+    #Keyset pagination for user owned objects
+    #Pages are located by the last seen sort key instead of an OFFSET,
+    #so no COUNT(*) is run and deep pages cost the same as the first one
+    page_size = settings.RECIPE_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.RECIPE_MAX_PAGE_SIZE
+    ordering = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        #Paginate only when the client asks for it, so existing clients
+        #keep receiving a plain list
+        params = request.query_params
+        if self.cursor_query_param not in params and \
+                self.page_size_query_param not in params:
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        #Use the sort key chosen by the view queryset, if it has one
+        if queryset.query.order_by:
+            return tuple(queryset.query.order_by)
+
+        return super().get_ordering(request, queryset, view)
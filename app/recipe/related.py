@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+from django.db.models.signals import m2m_changed
+
+from core.models import Recipe
+
+
+def related_ids(field_name, recipe_ids):
+    #Map recipe ids to the ids of their tags or ingredients in id order,
+    #read from the through table with a single query
+    field = Recipe._meta.get_field(field_name)
+    recipe_column = f'{field.m2m_field_name()}_id'
+    related_column = f'{field.m2m_reverse_field_name()}_id'
+
+    ids = defaultdict(list)
+    rows = field.remote_field.through.objects \
+        .filter(**{f'{recipe_column}__in': recipe_ids}) \
+        .order_by(related_column) \
+        .values_list(recipe_column, related_column)
+    for recipe_id, related_id in rows:
+        ids[recipe_id].append(related_id)
+
+    return ids
+
+
+def related_objects(field_name, recipe_ids, fields):
+    #Like related_ids, with a dict of the given fields of each related
+    #object, joined in the same query
+    field = Recipe._meta.get_field(field_name)
+    recipe_column = f'{field.m2m_field_name()}_id'
+    related_name = field.m2m_reverse_field_name()
+
+    objects = defaultdict(list)
+    rows = field.remote_field.through.objects \
+        .filter(**{f'{recipe_column}__in': recipe_ids}) \
+        .order_by(f'{related_name}_id') \
+        .values_list(recipe_column, *(
+            f'{related_name}__{name}' for name in fields
+        ))
+    for recipe_id, *values in rows:
+        objects[recipe_id].append(dict(zip(fields, values)))
+
+    return objects
+
+
+def _send_changed(recipe, field, action, pk_set, using):
+    m2m_changed.send(
+        sender=field.remote_field.through,
+        action=action,
+        instance=recipe,
+        reverse=False,
+        model=field.related_model,
+        pk_set=pk_set,
+        using=using
+    )
+
+
+def update_related(recipe, field_name, objs):
+    #Assign exactly objs as the recipe's tags or ingredients, deleting
+    #and inserting only the assignments that changed with one query each,
+    #m2m_changed is sent like by set() so cache and search stay current
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through
+    recipe_column = f'{field.m2m_field_name()}_id'
+    related_column = f'{field.m2m_reverse_field_name()}_id'
+
+    assigned = through.objects.filter(**{recipe_column: recipe.pk})
+    current = set(assigned.values_list(related_column, flat=True))
+    wanted = [obj.pk for obj in objs]
+    removed = current.difference(wanted)
+    added = set(wanted) - current
+
+    if removed:
+        _send_changed(recipe, field, 'pre_remove', removed, assigned.db)
+        assigned.filter(**{f'{related_column}__in': removed}).delete()
+        _send_changed(recipe, field, 'post_remove', removed, assigned.db)
+
+    if added:
+        _send_changed(recipe, field, 'pre_add', added, assigned.db)
+        #a concurrent request may have added the same assignment
+        through.objects.bulk_create(
+            (
+                through(**{recipe_column: recipe.pk, related_column: pk})
+                for pk in dict.fromkeys(wanted) if pk in added
+            ),
+            ignore_conflicts=True
+        )
+        _send_changed(recipe, field, 'post_add', added, assigned.db)
@@ -0,0 +1,84 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+from recipe.related import related_ids, related_objects
+
+
+#Fields whose values() column already is the rendered value
+PLAIN_FIELDS = (serializers.CharField, serializers.IntegerField)
+
+
+def _model_field(serializer, field):
+    try:
+        return serializer.Meta.model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+
+
+def columns(serializer):
+    #Model columns backing the fields rendered by serializer
+    names = ['id']
+    for field in serializer.fields.values():
+        model_field = _model_field(serializer, field)
+        if model_field is not None and model_field.concrete and \
+                not model_field.many_to_many and model_field.name != 'id':
+            names.append(model_field.name)
+
+    return names
+
+
+def _converter(serializer, field):
+    #Function turning a column value into the rendered value,
+    #None when the value is rendered as is
+    if isinstance(field, PLAIN_FIELDS):
+        return None
+
+    if isinstance(field, serializers.FileField):
+        #renders FieldFile objects, not stored names
+        model_field = _model_field(serializer, field)
+        return lambda name: field.to_representation(
+            model_field.attr_class(None, model_field, name)
+        )
+
+    return field.to_representation
+
+
+def _lookup(related):
+    #Related values of a recipe id, a new empty list for recipes without
+    return lambda recipe_id: related.get(recipe_id) or []
+
+
+def render(serializer, rows):
+    #Render values() rows the way serializer renders model instances,
+    #related objects are read for all rows with one query per relation
+    rows = list(rows)
+    recipe_ids = [row['id'] for row in rows]
+
+    fields = []
+    for name, field in serializer.fields.items():
+        model_field = _model_field(serializer, field)
+        if model_field is not None and model_field.many_to_many:
+            if isinstance(field, serializers.ListSerializer):
+                related = related_objects(
+                    model_field.name,
+                    recipe_ids,
+                    tuple(field.child.fields)
+                )
+            else:
+                related = related_ids(model_field.name, recipe_ids)
+            fields.append((name, 'id', _lookup(related)))
+        else:
+            fields.append((name, field.source, _converter(serializer, field)))
+
+    data = []
+    for row in rows:
+        item = {}
+        for name, column, convert in fields:
+            value = row[column]
+            if value is None or convert is None:
+                item[name] = value
+            else:
+                item[name] = convert(value)
+        data.append(item)
+
+    return data
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+                                           SearchVector, TrigramSimilarity
+from django.db.models import DecimalField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Upper
+
+from core.models import Recipe
+
+
+#Ranks are rounded to numeric, cursors store the rank as text and a float4
+#read back from it does not compare equal to the rank it was written from
+RANK_FIELD = DecimalField(max_digits=12, decimal_places=6)
+
+def search_vector_expression():
+    #Weighted vector of a recipe title (A) and its ingredient names (B)
+    config = settings.RECIPE_SEARCH_CONFIG
+    names = Recipe.ingredients.through.objects \
+        .filter(recipe=OuterRef('pk')) \
+        .values('recipe') \
+        .annotate(names=StringAgg('ingredient__name', ' ')) \
+        .values('names')
+
+    return SearchVector('title', weight='A', config=config) + \
+        SearchVector(
+            Coalesce(Subquery(names), Value('')),
+            weight='B',
+            config=config
+        )
+
+
+def update_search_vector(recipe_ids):
+    #Recompute the search vector of recipes with one UPDATE,
+    #queryset updates send no signals and leave updated_at alone
+    Recipe.objects.filter(pk__in=recipe_ids) \
+                  .update(search_vector=search_vector_expression())
+
+
+def search(queryset, terms):
+    #Filter recipes matching web search style terms, best matches first
+    query = SearchQuery(
+        terms,
+        config=settings.RECIPE_SEARCH_CONFIG,
+        search_type='websearch'
+    )
+
+    return queryset.filter(search_vector=query) \
+                   .annotate(rank=Cast(
+                       SearchRank(F('search_vector'), query),
+                       RANK_FIELD
+                   )) \
+                   .order_by('-rank', 'id')
+
+
+def autocomplete(queryset, term, limit):
+    #Return up to limit names matching term, best kind of match first:
+    #names starting with it, names containing it, then names similar to
+    #it, all served by the per-user trigram GIN index. Later steps only
+    #run while results are missing. Terms under 3 characters have no
+    #trigrams, their prefixes are read from the (user, name) index
+    matches = list(
+        queryset.filter(name__istartswith=term).order_by('name')[:limit]
+    )
+    if len(matches) == limit or len(term) < 3:
+        return matches
+
+    matches += queryset.filter(name__icontains=term) \
+                       .exclude(pk__in=[match.pk for match in matches]) \
+                       .order_by('name')[:limit - len(matches)]
+    if len(matches) == limit:
+        return matches
+
+    term = term.upper()
+    matches += queryset.annotate(upper_name=Upper('name')) \
+                       .filter(upper_name__trigram_similar=term) \
+                       .exclude(pk__in=[match.pk for match in matches]) \
+                       .annotate(
+                           similarity=TrigramSimilarity('upper_name', term)
+                       ) \
+                       .order_by('-similarity', 'name')[:limit - len(matches)]
+
+    return matches
@@ -1,7 +1,44 @@
 from django.contrib.auth import models
+from django.db import transaction
 from rest_framework import serializers
 
 from core.models import Recipe, Tag, Ingredient
+from recipe import images
+from recipe.fields import UserPrimaryKeyRelatedField
+from recipe.related import update_related
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    #Serializer for creating a batch of named user objects at once
+
+    def create(self, validated_data):
+        #Insert the whole batch with a single query
+        model = self.child.Meta.model
+        if not self.context.get('skip_existing'):
+            return model.objects.bulk_create(
+                model(**attrs) for attrs in validated_data
+            )
+
+        #Names the user already has, or that repeat in the batch,
+        #resolve to the existing object instead of creating another one
+        objects = {
+            (obj.user_id, obj.name): obj for obj in model.objects.filter(
+                user__in={attrs['user'] for attrs in validated_data},
+                name__in={attrs['name'] for attrs in validated_data}
+            )
+        }
+        new = []
+        for attrs in validated_data:
+            key = (attrs['user'].pk, attrs['name'])
+            if key not in objects:
+                objects[key] = model(**attrs)
+                new.append(objects[key])
+        model.objects.bulk_create(new)
+
+        return [
+            objects[(attrs['user'].pk, attrs['name'])]
+            for attrs in validated_data
+        ]
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -11,6 +48,7 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkCreateListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -20,38 +58,131 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkCreateListSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class TagCountSerializer(TagSerializer):
+    #Serializer for tag objects annotated with their recipe count
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('recipe_count',)
+
+
+class IngredientCountSerializer(IngredientSerializer):
+    #Serializer for ingredient objects annotated with their recipe count
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ('recipe_count',)
+
+
+class SparseFieldsMixin:
+    #Render only the field names listed in the 'fields' context entry
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if requested is not None:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
+
+class ExpandableFieldsMixin:
+    #Render the relations listed in the 'expand' context entry as nested
+    #objects, expandable_fields maps them to their serializer
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.context.get('expand') or ():
+            if name in self.fields:
+                self.fields[name] = self.expandable_fields[name](
+                    many=True,
+                    read_only=True
+                )
+
+
+class RecipeSerializer(ExpandableFieldsMixin, SparseFieldsMixin,
+                       serializers.ModelSerializer):
     #Serializer for recipe object
 
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
 
+    expandable_fields = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
+
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'ingredients', 'tags',
                  'time_minutes', 'price', 'link')
         read_only_fields = ('id',)
 
+    def update(self, instance, validated_data):
+        #Save the recipe and only the changed tag and ingredient
+        #assignments together
+        related = {
+            field_name: validated_data.pop(field_name)
+            for field_name in ('ingredients', 'tags')
+            if field_name in validated_data
+        }
+
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            for field_name, objs in related.items():
+                update_related(instance, field_name, objs)
+
+        return instance
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    #Map of rendition width to the URL of the resized image
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = 'image_renditions'
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        storage = Recipe._meta.get_field('image').storage
+        urls = {}
+        for width, name in value.items():
+            url = storage.url(name)
+            urls[width] = request.build_absolute_uri(url) if request else url
+
+        return urls
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     #Serializer for detail recipe object
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    image = serializers.ImageField(read_only=True)
+    renditions = ImageRenditionsField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('image', 'renditions')
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
+    renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
\ No newline at end of file
+        fields = ('id', 'image', 'renditions')
+        read_only_fields = ('id',)
+
+    def validate_image(self, value):
+        #Store a recompressed copy without metadata instead of the upload
+        return images.recompress(value)
\ No newline at end of file
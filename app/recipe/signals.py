@@ -0,0 +1,111 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+                                     pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.caching import RECIPES_SCOPE, bump_user_version
+from recipe.images import schedule_release
+from recipe.search import update_search_vector
+
+
+#Cache scope of each recipe relation, matches BaseRecipeAttrViewSet
+#and the name of the Recipe field pointing at the model
+SCOPES = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+
+
+def touch_recipes(queryset):
+    #Move updated_at of recipes whose representation changed
+    queryset.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created, **kwargs):
+    #Invalidate cached lists when a tag or ingredient changes
+    bump_user_version(SCOPES[sender], instance.user_id)
+
+    if not created:
+        #recipe details render tag and ingredient names
+        touch_recipes(Recipe.objects.filter(**{SCOPES[sender]: instance}))
+        bump_user_version(RECIPES_SCOPE, instance.user_id)
+
+        if sender is Ingredient:
+            update_search_vector(instance.recipe_set.values('pk'))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    #Assignments are dropped without m2m_changed, touch recipes first
+    touch_recipes(Recipe.objects.filter(**{SCOPES[sender]: instance}))
+
+    if sender is Ingredient:
+        #search vectors are recomputed once the ingredient is gone
+        instance._recipe_ids = list(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    bump_user_version(SCOPES[sender], instance.user_id)
+    bump_user_version(RECIPES_SCOPE, instance.user_id)
+
+    if sender is Ingredient and instance._recipe_ids:
+        update_search_vector(instance._recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_assignment_changed(sender, instance, action, reverse, model,
+                              pk_set, **kwargs):
+    #Invalidate cached lists when recipes are (un)assigned,
+    #instance is a recipe or, for reverse changes, a tag/ingredient
+    if reverse and action == 'pre_clear':
+        recipes = Recipe.objects.filter(**{SCOPES[type(instance)]: instance})
+        touch_recipes(recipes)
+        instance._recipe_ids = list(recipes.values_list('pk', flat=True))
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if reverse:
+            if pk_set:
+                touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+        else:
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+
+        scope = SCOPES.get(model) or SCOPES[type(instance)]
+        bump_user_version(scope, instance.user_id)
+        bump_user_version(RECIPES_SCOPE, instance.user_id)
+
+    if sender is Recipe.ingredients.through and \
+            action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            update_search_vector([instance.pk])
+        elif action == 'post_clear':
+            update_search_vector(instance._recipe_ids)
+        elif pk_set:
+            update_search_vector(pk_set)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    bump_user_version(RECIPES_SCOPE, instance.user_id)
+
+    #the title may have changed
+    update_search_vector([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    #Deleting a recipe drops its assignments without m2m_changed
+    for scope in SCOPES.values():
+        bump_user_version(scope, instance.user_id)
+    bump_user_version(RECIPES_SCOPE, instance.user_id)
+
+    if instance.image:
+        schedule_release(instance.image.name, instance.image_renditions)
@@ -0,0 +1,154 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.mixins import ListModelMixin
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.caching import user_version
+from recipe.checks import check_shared_cache
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class RecipeAttrListCacheTests(TestCase):
+    #Test caching of tag and ingredient lists
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'cache@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+
+    def _names(self, url, params=None):
+        return [item['name'] for item in self.client.get(url, params).data]
+
+    def test_list_served_from_cache(self):
+        #Test repeated list requests do not hit the database
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data[0]['name'], 'Vegan')
+
+    def test_cache_keyed_by_query_params(self):
+        #Test different query params are cached separately
+        self._names(TAGS_URL)
+
+        self.assertEqual(self._names(TAGS_URL, {'assigned_only': 1}), [])
+
+    def test_cache_keyed_by_user(self):
+        #Test users never see each other's cached lists
+        self._names(TAGS_URL)
+        user2 = get_user_model().objects.create_user(
+            'other@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user2)
+
+        self.assertEqual(self._names(TAGS_URL), [])
+
+    def test_invalidated_on_create(self):
+        #Test creating a tag invalidates the cached list
+        self._names(TAGS_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(TAGS_URL, {'name': 'Dessert'})
+
+        self.assertEqual(self._names(TAGS_URL), ['Vegan', 'Dessert'])
+
+    def test_invalidated_on_assignment(self):
+        #Test assigning ingredients to a recipe invalidates the list
+        ingredient = Ingredient.objects.create(user=self.user, name='Rice')
+        self.assertEqual(
+            self._names(INGREDIENTS_URL, {'assigned_only': 1}),
+            []
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title='Rice bowl',
+                time_minutes=10,
+                price=5.00
+            )
+            recipe.ingredients.add(ingredient)
+
+        self.assertEqual(
+            self._names(INGREDIENTS_URL, {'assigned_only': 1}),
+            ['Rice']
+        )
+
+    def test_invalidated_on_recipe_delete(self):
+        #Test deleting a recipe invalidates assigned lists
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Salad',
+            time_minutes=10,
+            price=5.00
+        )
+        recipe.tags.add(self.tag)
+        self.assertEqual(self._names(TAGS_URL, {'assigned_only': 1}), ['Vegan'])
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+
+        self.assertEqual(self._names(TAGS_URL, {'assigned_only': 1}), [])
+
+    def test_invalidated_after_commit(self):
+        #Test the version only moves once the write is committed, so
+        #concurrent requests can not cache old rows under the new one
+        version = user_version('tags', self.user.pk)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(TAGS_URL, {'name': 'Dessert'})
+            self.assertEqual(user_version('tags', self.user.pk), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(user_version('tags', self.user.pk), version)
+
+
+    def test_write_during_list_not_cached_as_new(self):
+        #Test rows read before a write commits are not stored under the
+        #version that write moved to
+        list_rows = ListModelMixin.list
+
+        def list_then_write(view, request, *args, **kwargs):
+            response = list_rows(view, request, *args, **kwargs)
+            with self.captureOnCommitCallbacks(execute=True):
+                Tag.objects.create(user=self.user, name='Dessert')
+            return response
+
+        with patch.object(ListModelMixin, 'list', list_then_write):
+            self.assertEqual(self._names(TAGS_URL), ['Vegan'])
+
+        self.assertEqual(self._names(TAGS_URL), ['Vegan', 'Dessert'])
+
+class SharedCacheCheckTests(TestCase):
+    #Test deployments must share cache versions between processes
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_process_local_cache_rejected(self):
+        #Test a per process cache is reported
+        errors = check_shared_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['recipe.E001'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': 'memcached:11211',
+    }})
+    def test_shared_cache_accepted(self):
+        #Test memcached passes the check
+        self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    #Return a recipe detail url
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeConditionalGetTests(TestCase):
+    #Test ETag and If-None-Match handling of the recipe API
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'etag@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pancakes',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def _get(self, url, etag=None, params=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, params, **headers)
+
+    def test_list_not_modified(self):
+        #Test an unchanged list is answered with 304 without queries
+        etag = self._get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self._get(RECIPES_URL, etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertFalse(res.content)
+
+    def test_list_etag_depends_on_params(self):
+        #Test query params are part of the list ETag
+        etag = self._get(RECIPES_URL)['ETag']
+
+        res = self._get(RECIPES_URL, etag, {'page_size': 10})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_modified_by_write(self):
+        #Test creating a recipe changes the list ETag
+        etag = self._get(RECIPES_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                RECIPES_URL,
+                {'title': 'Waffles', 'time_minutes': 5, 'price': 3.00}
+            )
+
+        res = self._get(RECIPES_URL, etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data), 2)
+
+    def test_detail_not_modified(self):
+        #Test an unchanged recipe is answered with 304
+        url = detail_url(self.recipe.id)
+        etag = self._get(url)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self._get(url, etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_modified_by_assignment(self):
+        #Test adding a tag changes the recipe ETag
+        url = detail_url(self.recipe.id)
+        etag = self._get(url)['ETag']
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Sweet'))
+
+        res = self._get(url, etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Sweet')
+
+    def test_detail_modified_by_tag_rename(self):
+        #Test renaming an assigned tag changes the recipe ETag
+        tag = Tag.objects.create(user=self.user, name='Sweet')
+        self.recipe.tags.add(tag)
+        url = detail_url(self.recipe.id)
+        etag = self._get(url)['ETag']
+        tag.name = 'Sugary'
+        tag.save()
+
+        res = self._get(url, etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Sugary')
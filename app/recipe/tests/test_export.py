@@ -0,0 +1,99 @@
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import RecipeSerializer
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+@override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+class RecipeExportTests(TestCase):
+    #Test streaming exports of a user's recipes
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'export@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Rice')
+        self.recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=5.00
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+            self.recipes.append(recipe)
+
+    def _content(self, res):
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        #Test recipes are exported one JSON document per line
+        res = self.client.get(EXPORT_URL)
+
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        lines = [json.loads(line) for line in self._content(res).splitlines()]
+        self.assertEqual(
+            lines,
+            [dict(RecipeSerializer(recipe).data) for recipe in self.recipes]
+        )
+
+    def test_export_csv(self):
+        #Test recipes are exported as CSV with ?format=csv
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        rows = list(csv.reader(self._content(res).splitlines()))
+        self.assertEqual(rows[0], ['id', 'title', 'ingredients', 'tags',
+                                   'time_minutes', 'price', 'link'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][1], 'Recipe 0')
+        self.assertEqual(rows[1][5], '5.00')
+
+    def test_export_limited_to_user(self):
+        #Test only the user's recipes are exported
+        other_user = get_user_model().objects.create_user(
+            'other@djangoproject.com',
+            'testpass'
+        )
+        Recipe.objects.create(
+            user=other_user,
+            title='Secret',
+            time_minutes=10,
+            price=5.00
+        )
+
+        content = self._content(self.client.get(EXPORT_URL))
+
+        self.assertNotIn('Secret', content)
+
+    def test_export_queries_per_chunk(self):
+        #Test related ids are loaded once per chunk, not per recipe
+        res = self.client.get(EXPORT_URL)
+
+        #recipes, then tags and ingredients for each of three chunks
+        with self.assertNumQueries(1 + 3 * 2):
+            self._content(res)
+
+    def test_export_auth_required(self):
+        #Test exports require authentication
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('detail', json.loads(res.content))
@@ -0,0 +1,406 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe import images, metrics
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+def image_upload_url(recipe_id):
+    #Return url for recipe image upload
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_image_file(size=(1200, 800), image_format='JPEG', **options):
+    #Return a temporary image file
+    ntf = tempfile.NamedTemporaryFile(suffix=f'.{image_format.lower()}')
+    Image.new('RGB', size, color='red').save(ntf, format=image_format,
+                                             **options)
+    ntf.seek(0)
+    return ntf
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RECIPE_IMAGE_RENDITIONS=(160, 480))
+class RecipeImageRenditionTests(TestCase):
+    #Test generating resized copies of recipe images
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'images@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pizza',
+            time_minutes=20,
+            price=10.00
+        )
+
+    def _set_image(self, size):
+        with sample_image_file(size) as ntf:
+            self.recipe.image.save('pizza.jpg', ContentFile(ntf.read()))
+
+    def test_generate_renditions(self):
+        #Test resized copies are written and recorded on the recipe
+        self._set_image((1200, 800))
+
+        renditions = images.generate_renditions(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(set(self.recipe.image_renditions), {'160', '480'})
+        self.assertEqual(self.recipe.image_renditions, renditions)
+        with Image.open(self.recipe.image.storage.path(renditions['160'])) \
+                as rendition:
+            self.assertEqual(rendition.size, (160, 107))
+
+    def test_generate_renditions_never_upscales(self):
+        #Test no renditions wider than the original are generated
+        self._set_image((300, 200))
+
+        renditions = images.generate_renditions(self.recipe.id)
+
+        self.assertEqual(list(renditions), ['160'])
+
+    def test_generate_renditions_changes_etag(self):
+        #Test a detail fetched before the renditions is not kept by clients
+        self._set_image((1200, 800))
+        url = reverse('recipe:recipe-detail', args=[self.recipe.id])
+        res = self.client.get(url)
+        self.assertEqual(res.data['renditions'], {})
+
+        images.generate_renditions(self.recipe.id)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data['renditions']), {'160', '480'})
+
+    def test_upload_schedules_renditions_after_commit(self):
+        #Test uploading hands rendition work to the worker pool
+        with patch('recipe.images.submit_renditions') as submit, \
+                self.captureOnCommitCallbacks(execute=True):
+            with sample_image_file() as ntf:
+                res = self.client.post(
+                    image_upload_url(self.recipe.id),
+                    {'image': ntf},
+                    format='multipart'
+                )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['renditions'], {})
+        submit.assert_called_once_with(self.recipe.id)
+
+    def test_renditions_exposed_as_urls(self):
+        #Test the detail endpoint returns absolute rendition URLs
+        self._set_image((1200, 800))
+        images.generate_renditions(self.recipe.id)
+
+        res = self.client.get(
+            reverse('recipe:recipe-detail', args=[self.recipe.id])
+        )
+
+        self.assertTrue(res.data['renditions']['480'].startswith('http://'))
+        self.assertTrue(res.data['renditions']['480'].endswith('-480.jpg'))
+        self.assertTrue(os.path.exists(
+            self.recipe.image.storage.path(
+                images.rendition_name(self.recipe.image.name, 480)
+            )
+        ))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeImageRecompressionTests(TestCase):
+    #Test uploads are re-encoded without metadata
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'recompress@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pizza',
+            time_minutes=20,
+            price=10.00
+        )
+
+    def _upload(self, ntf):
+        with patch('recipe.images.submit_renditions'):
+            res = self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': ntf},
+                format='multipart'
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+
+    def test_upload_orientation_applied_and_exif_stripped(self):
+        #Test EXIF orientation is applied and then removed
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010f] = 'Camera maker'
+        with sample_image_file((40, 20), exif=exif.tobytes()) as ntf:
+            self._upload(ntf)
+
+        with Image.open(self.recipe.image.path) as image:
+            self.assertEqual(image.size, (20, 40))
+            self.assertEqual(dict(image.getexif()), {})
+            self.assertEqual(image.format, 'JPEG')
+
+    @override_settings(RECIPE_IMAGE_FORMAT='PNG')
+    def test_upload_reencoded_to_configured_format(self):
+        #Test uploads are stored in the configured format
+        with sample_image_file((40, 20)) as ntf:
+            self._upload(ntf)
+
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+        with Image.open(self.recipe.image.path) as image:
+            self.assertEqual(image.format, 'PNG')
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=1000)
+    def test_upload_pixel_limit(self):
+        #Test images with too many pixels are refused
+        with sample_image_file((100, 100)) as ntf:
+            res = self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': ntf},
+                format='multipart'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
+    def test_upload_truncated_image(self):
+        #Test an image cut off after its header is refused
+        with sample_image_file((400, 400)) as ntf:
+            content = ntf.read()
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            ntf.write(content[:len(content) // 2])
+            ntf.seek(0)
+            res = self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': ntf},
+                format='multipart'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['image'], [images.INVALID_IMAGE])
+
+    def test_upload_records_bytes(self):
+        #Test the bytes uploaded and stored are counted separately
+        for options in ({'quality': 100}, {'quality': 10}):
+            uploaded = metrics.get('recipe_image_bytes_uploaded')
+            stored = metrics.get('recipe_image_bytes_stored')
+            with sample_image_file((400, 400), **options) as ntf:
+                size = os.path.getsize(ntf.name)
+                self._upload(ntf)
+
+            self.assertEqual(
+                metrics.get('recipe_image_bytes_uploaded') - uploaded,
+                size
+            )
+            self.assertEqual(
+                metrics.get('recipe_image_bytes_stored') - stored,
+                self.recipe.image.size
+            )
+
+    def test_metrics_never_decremented(self):
+        #Test counters refuse negative increments
+        with self.assertRaises(ValueError):
+            metrics.incr('recipe_image_bytes_stored', -1)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RECIPE_IMAGE_CONTENT_ADDRESSED=True)
+class ContentAddressedImageTests(TestCase):
+    #Test identical images are stored once and released when unused
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'dedupe@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _recipe_with_image(self, size=(40, 20)):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pizza',
+            time_minutes=20,
+            price=10.00
+        )
+        with patch('recipe.images.submit_renditions'), \
+                self.captureOnCommitCallbacks(execute=True), \
+                sample_image_file(size) as ntf:
+            res = self.client.post(
+                image_upload_url(recipe.id),
+                {'image': ntf},
+                format='multipart'
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+
+        return recipe
+
+    def test_identical_uploads_share_file(self):
+        #Test the same image uploaded twice is stored under one hash name
+        first = self._recipe_with_image()
+        second = self._recipe_with_image()
+
+        with first.image.open('rb') as image_file:
+            digest = hashlib.sha256(image_file.read()).hexdigest()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image.name, f'uploads/recipe/{digest}.jpg')
+
+    def test_delete_keeps_shared_file(self):
+        #Test deleting a recipe keeps an image another recipe uses
+        first = self._recipe_with_image()
+        second = self._recipe_with_image()
+        path = second.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_delete_removes_renditions(self):
+        #Test renditions of an unused image are deleted with it
+        recipe = self._recipe_with_image((1200, 800))
+        renditions = images.generate_renditions(recipe.id)
+        paths = [recipe.image.storage.path(name)
+                 for name in renditions.values()]
+        self.assertTrue(paths)
+        recipe.refresh_from_db()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    @override_settings(RECIPE_IMAGE_FORMAT='PNG')
+    def test_delete_keeps_shared_renditions(self):
+        #Test renditions another recipe records are kept, different
+        #originals can scale down to the same file
+        first = self._recipe_with_image((1200, 800))
+        second = self._recipe_with_image((2400, 1600))
+        self.assertNotEqual(first.image.name, second.image.name)
+        renditions = images.generate_renditions(first.id)
+        self.assertEqual(images.generate_renditions(second.id), renditions)
+        paths = [first.image.storage.path(name)
+                 for name in renditions.values()]
+        first.refresh_from_db()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+        second.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_replacing_image_releases_previous(self):
+        #Test uploading a new image deletes the unused previous one
+        recipe = self._recipe_with_image((40, 20))
+        path = recipe.image.path
+
+        with patch('recipe.images.submit_renditions'), \
+                self.captureOnCommitCallbacks(execute=True), \
+                sample_image_file((20, 40)) as ntf:
+            self.client.post(
+                image_upload_url(recipe.id),
+                {'image': ntf},
+                format='multipart'
+            )
+
+        recipe.refresh_from_db()
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(recipe.image.path))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RECIPE_IMAGE_CONTENT_ADDRESSED=True)
+class ContentAddressedReleaseRaceTests(TransactionTestCase):
+    #Test releasing a shared file while another upload reuses it
+
+    def _recipe(self, user):
+        return Recipe.objects.create(
+            user=user,
+            title='Pizza',
+            time_minutes=20,
+            price=10.00
+        )
+
+    def test_release_waits_for_uncommitted_reuse(self):
+        #Test the release sees the reference once the reuse commits
+        user = get_user_model().objects.create_user(
+            'race@djangoproject.com',
+            'testpass'
+        )
+        with sample_image_file((40, 20)) as ntf:
+            content = ntf.read()
+        first = self._recipe(user)
+        with transaction.atomic():
+            first.image.save('pizza.jpg', ContentFile(content))
+        name = first.image.name
+        Recipe.objects.filter(pk=first.pk).update(image=None)
+        second = self._recipe(user)
+        reused = threading.Event()
+        commit = threading.Event()
+
+        def reuse():
+            try:
+                with transaction.atomic():
+                    second.image.save('pizza.jpg', ContentFile(content))
+                    reused.set()
+                    commit.wait(5)
+            finally:
+                connection.close()
+
+        def release():
+            try:
+                images.release_image(name, {})
+            finally:
+                connection.close()
+
+        uploader = threading.Thread(target=reuse)
+        uploader.start()
+        self.assertTrue(reused.wait(5))
+        releaser = threading.Thread(target=release)
+        releaser.start()
+        releaser.join(0.5)
+        self.assertTrue(releaser.is_alive())
+
+        commit.set()
+        uploader.join(5)
+        releaser.join(5)
+
+        second.refresh_from_db()
+        self.assertEqual(second.image.name, name)
+        self.assertTrue(os.path.exists(second.image.path))
@@ -0,0 +1,182 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.importer import import_recipes
+
+
+IMPORT_URL = reverse('recipe:recipe-import-recipes')
+
+
+def ndjson(*recipes):
+    #Encode recipes as newline delimited JSON
+    return '\n'.join(
+        recipe if isinstance(recipe, str) else json.dumps(recipe)
+        for recipe in recipes
+    ).encode()
+
+
+class RecipeImportTests(TestCase):
+    #Test streaming NDJSON recipe imports
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'import@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Rice'
+        )
+
+    def _import(self, body):
+        #Return the report lines, read while the recipes are imported
+        res = self.client.generic(
+            'POST',
+            IMPORT_URL,
+            body,
+            content_type='application/x-ndjson'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'],
+                         'application/x-ndjson; charset=utf-8')
+
+        return [json.loads(line) for line in res.streaming_content]
+
+    def _recipe(self, number, **params):
+        recipe = {
+            'title': f'Recipe {number}',
+            'time_minutes': 10,
+            'price': '5.00',
+        }
+        recipe.update(params)
+        return recipe
+
+    def test_import_recipes(self):
+        #Test recipes and their assignments are imported
+        report = self._import(ndjson(
+            self._recipe(1, tags=[self.tag.id],
+                         ingredients=[self.ingredient.id]),
+            self._recipe(2)
+        ))
+
+        self.assertEqual(report, [{'created': 2, 'failed': 0}])
+        recipe = Recipe.objects.get(user=self.user, title='Recipe 1')
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+        self.assertEqual(list(recipe.ingredients.all()), [self.ingredient])
+
+    def test_import_reports_errors_per_line(self):
+        #Test invalid lines are reported and the rest imported
+        other_user = get_user_model().objects.create_user(
+            'other@djangoproject.com',
+            'testpass'
+        )
+        other_tag = Tag.objects.create(user=other_user, name='Secret')
+
+        *errors, summary = self._import(ndjson(
+            self._recipe(1),
+            '{not json',
+            self._recipe(3, time_minutes='soon'),
+            '',
+            self._recipe(5, tags=[other_tag.id])
+        ))
+
+        self.assertEqual(summary, {'created': 1, 'failed': 3})
+        self.assertEqual([error['line'] for error in errors], [2, 3, 5])
+        self.assertIn('time_minutes', errors[1]['errors'])
+        self.assertIn('tags', errors[2]['errors'])
+        self.assertFalse(Recipe.objects.filter(tags=other_tag).exists())
+
+    @override_settings(RECIPE_IMPORT_MAX_LINE_BYTES=100)
+    def test_import_rejects_long_lines(self):
+        #Test a line over the limit is reported without being read whole
+        long_recipe = self._recipe(2, link='https://example.com/' + 'x' * 500)
+
+        report = self._import(ndjson(
+            self._recipe(1),
+            long_recipe,
+            self._recipe(3)
+        ))
+
+        self.assertEqual(report, [
+            {'line': 2, 'errors': {
+                'non_field_errors': ['Line is longer than 100 bytes.']
+            }},
+            {'created': 2, 'failed': 1},
+        ])
+        self.assertEqual(
+            list(Recipe.objects.filter(user=self.user)
+                               .values_list('title', flat=True)
+                               .order_by('title')),
+            ['Recipe 1', 'Recipe 3']
+        )
+
+    def test_import_query_count_independent_of_size(self):
+        #Test a chunk costs the same number of queries for any size
+        recipes = [
+            self._recipe(i, tags=[self.tag.id],
+                         ingredients=[self.ingredient.id])
+            for i in range(100)
+        ]
+
+        #two related id checks, savepoint, three inserts,
+        #search vector update, release
+        with self.assertNumQueries(8):
+            report = self._import(ndjson(*recipes))
+
+        self.assertEqual(report, [{'created': 100, 'failed': 0}])
+
+    def test_import_reports_errors_as_it_goes(self):
+        #Test errors of a chunk are reported before later lines are read
+        read = []
+
+        def lines():
+            for number in range(1, 4):
+                read.append(number)
+                yield b'{not json'
+
+        report = import_recipes(self.user, lines(), chunk_size=1)
+
+        self.assertEqual(next(report)['line'], 1)
+        self.assertEqual(read, [1])
+        self.assertEqual(list(report)[-1], {'created': 0, 'failed': 3})
+
+    def test_import_invalidates_recipe_list(self):
+        #Test imported recipes show up in the recipe list
+        self.client.get(reverse('recipe:recipe-list'))
+        self._import(ndjson(self._recipe(1)))
+
+        res = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_import_command(self):
+        #Test importing recipes from a file with the management command
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as ntf:
+            ntf.write(ndjson(self._recipe(1), self._recipe(2), '[]'))
+            ntf.flush()
+            stdout, stderr = StringIO(), StringIO()
+            call_command(
+                'import_recipes',
+                self.user.email,
+                ntf.name,
+                chunk_size=1,
+                stdout=stdout,
+                stderr=stderr
+            )
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        self.assertIn('Imported 2 recipes, 1 lines failed', stdout.getvalue())
+        self.assertIn('"line": 3', stderr.getvalue())
@@ -134,4 +134,55 @@ class PrivateIngredientsApiTests(TestCase):
         recipe2.ingredients.add(ingredient)
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
-        self.assertEqual(len(res.data), 1)
\ No newline at end of file
+        self.assertEqual(len(res.data), 1)
+
+    def test_retrieve_ingredients_popular_first(self):
+        #Test ordering ingredients by the number of recipes using them
+        eggs = Ingredient.objects.create(user=self.user, name='Eggs')
+        cheese = Ingredient.objects.create(user=self.user, name='Cheese')
+        for title in ('Omelette', 'Quiche'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=20,
+                price=5.00,
+                user=self.user
+            )
+            recipe.ingredients.add(eggs)
+        recipe.ingredients.add(cheese)
+
+        res = self.client.get(INGREDIENTS_URL, {'ordering': 'popular'})
+
+        self.assertEqual(
+            [(item['name'], item['recipe_count']) for item in res.data],
+            [('Eggs', 2), ('Cheese', 1)]
+        )
+
+    def test_bulk_create_ingredients(self):
+        #Test creating a batch of ingredients from a JSON array
+        Ingredient.objects.create(user=self.user, name='Salt')
+        self.client.get(INGREDIENTS_URL)
+        payload = [{'name': 'Salt'}, {'name': 'Pepper'}]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(INGREDIENTS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['name'] for item in res.data],
+                         ['Salt', 'Pepper'])
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user, name='Salt').count(),
+            2
+        )
+        res = self.client.get(INGREDIENTS_URL)
+        self.assertEqual(len(res.data), 3)
+
+    def test_autocomplete_ingredients_fuzzy(self):
+        #Test misspelled names still find the ingredient
+        Ingredient.objects.create(user=self.user, name='Mozzarella')
+        Ingredient.objects.create(user=self.user, name='Mushroom')
+
+        res = self.client.get(reverse('recipe:ingredient-autocomplete'),
+                              {'q': 'mozarela'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in res.data], ['Mozzarella'])
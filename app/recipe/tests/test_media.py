@@ -0,0 +1,131 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+CONTENT = bytes(range(256)) * 4
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+def media_url(name):
+    return reverse('media', args=[name])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SERVE_BACKEND='django')
+class RecipeMediaTests(TestCase):
+    #Test serving recipe images to their owner
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'media@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pizza',
+            time_minutes=20,
+            price=10.00
+        )
+        self.recipe.image.save('pizza.jpg', ContentFile(CONTENT))
+        self.name = self.recipe.image.name
+
+    def test_serve_image(self):
+        #Test the owner gets the file with immutable caching
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('private', res['Cache-Control'])
+
+    def test_serve_rendition(self):
+        #Test renditions of the user's recipes are served
+        storage = self.recipe.image.storage
+        rendition = storage.save('uploads/recipe/small.jpg',
+                                 ContentFile(b'small'))
+        self.recipe.image_renditions = {'160': rendition}
+        self.recipe.save()
+
+        res = self.client.get(media_url(rendition))
+
+        self.assertEqual(b''.join(res.streaming_content), b'small')
+
+    def test_other_users_image_not_found(self):
+        #Test files of another user's recipes are not served
+        other = get_user_model().objects.create_user(
+            'other@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_login_required(self):
+        #Test media is not served to anonymous users
+        res = APIClient().get(media_url(self.name))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_range_request(self):
+        #Test a byte range is answered with partial content
+        res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[10:20])
+        self.assertEqual(res['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(res['Content-Length'], '10')
+
+    def test_suffix_range_request(self):
+        #Test a suffix range returns the end of the file
+        res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=-5')
+
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[-5:])
+
+    def test_unsatisfiable_range(self):
+        #Test a range past the end of the file is refused
+        res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=5000-')
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    @override_settings(MEDIA_SERVE_BACKEND='nginx')
+    def test_nginx_backend(self):
+        #Test nginx is told to send the file
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            f'/protected-media/{self.name}'
+        )
+        self.assertFalse(res.content)
+        self.assertIn('immutable', res['Cache-Control'])
+
+    @override_settings(MEDIA_SERVE_BACKEND='apache')
+    def test_apache_backend(self):
+        #Test apache is told to send the file
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res['X-Sendfile'], self.recipe.image.path)
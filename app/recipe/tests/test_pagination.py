@@ -0,0 +1,112 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.pagination import RecipeCursorPagination
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def sample_recipe(user, **params):
+    #Create and return sample recipe
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class CursorPaginationTests(TestCase):
+    #Test keyset pagination of the recipe API lists
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_paginated_by_default(self):
+        #Test that lists stay plain when no cursor params are sent
+        sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+
+    def test_recipes_paginated_by_id(self):
+        #Test walking all recipe pages with the next cursor
+        recipes = [sample_recipe(user=self.user) for i in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        ids = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(ids, [recipe.id for recipe in recipes])
+
+    def test_pagination_runs_no_count(self):
+        #Test that paginating does not count the whole table
+        for i in range(3):
+            sample_recipe(user=self.user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(len(res.data['results']), 2)
+        for query in ctx.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    @patch.object(RecipeCursorPagination, 'max_page_size', 2)
+    def test_page_size_capped(self):
+        #Test that page size cannot exceed the configured maximum
+        for i in range(3):
+            sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_tags_paginated_by_name(self):
+        #Test that tags keep their ordering when paginated
+        for name in ('Apple', 'Banana', 'Cherry'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        names = [tag['name'] for tag in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [tag['name'] for tag in res.data['results']]
+
+        self.assertEqual(names, ['Cherry', 'Banana', 'Apple'])
+        self.assertIsNone(res.data['next'])
+
+
+    def test_tags_with_equal_names_paginated(self):
+        #Test that tags sharing a name are each listed exactly once
+        tags = [
+            Tag.objects.create(user=self.user, name='Vegan') for _ in range(5)
+        ]
+
+        ids = []
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        ids += [tag['id'] for tag in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [tag['id'] for tag in res.data['results']]
+
+        self.assertEqual(ids, [tag.id for tag in reversed(tags)])
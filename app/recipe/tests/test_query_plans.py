@@ -0,0 +1,110 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL')
+class QueryPlanTests(TestCase):
+    #Test that endpoint queries are served by indexes
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'plans@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Rice'
+        )
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Rice bowl',
+            time_minutes=10,
+            price=5.00
+        )
+        recipe.tags.add(self.tag)
+        recipe.ingredients.add(self.ingredient)
+
+    def _plans(self, url, params=None):
+        #Return EXPLAIN output for every query the endpoint runs
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        plans = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            #the test tables are tiny, make the planner prefer indexes
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for query in ctx.captured_queries:
+                cursor.execute(f'EXPLAIN {query["sql"]}')
+                plans.append('\n'.join(row[0] for row in cursor.fetchall()))
+
+        return plans
+
+    def assertIndexScans(self, plans, index_name):
+        for plan in plans:
+            self.assertNotIn('Seq Scan', plan)
+        self.assertTrue(any(index_name in plan for plan in plans))
+
+    def test_tags_list_plan(self):
+        #Test listing tags scans the (user_id, name) index
+        plans = self._plans(TAGS_URL)
+
+        self.assertIndexScans(plans, 'tag_user_name_idx')
+
+    def test_ingredients_list_plan(self):
+        #Test listing ingredients scans the (user_id, name) index
+        plans = self._plans(INGREDIENTS_URL)
+
+        self.assertIndexScans(plans, 'ingredient_user_name_idx')
+
+    def test_recipes_list_plan(self):
+        #Test listing recipes scans the (user_id, id) index
+        plans = self._plans(RECIPES_URL)
+
+        self.assertIndexScans(plans, 'recipe_user_id_idx')
+
+    def test_recipes_filter_plan(self):
+        #Test filtering recipes by tag uses the through table indexes
+        plans = self._plans(RECIPES_URL, {'tags': self.tag.id})
+
+        self.assertIndexScans(plans, 'recipe_tags_tag_recipe_idx')
+
+    def test_autocomplete_plan(self):
+        #Test autocomplete is served by the per-user trigram index
+        for model, url, index_name in (
+            (Tag, reverse('recipe:tag-autocomplete'),
+             'tag_user_name_trgm_idx'),
+            (Ingredient, reverse('recipe:ingredient-autocomplete'),
+             'ingredient_user_name_trgm_idx'),
+        ):
+            #with a handful of rows every user_id index looks as good
+            model.objects.bulk_create(
+                model(user=self.user, name=f'Name {i}') for i in range(2000)
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT gin_clean_pending_list('{index_name}')"
+                )
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+            plans = self._plans(url, {'q': 'vegan'})
+
+            self.assertIndexScans(plans, index_name)
@@ -4,7 +4,9 @@ import tempfile
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -176,6 +178,32 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_other_users_tags(self):
+        #Test tags of other users are rejected, all of them in one error
+        user2 = get_user_model().objects.create_user(
+            'other@djangoproject.com',
+            'testpass'
+        )
+        own = sample_tag(user=self.user)
+        other1 = sample_tag(user=user2, name='Vegan')
+        other2 = sample_tag(user=user2, name='Dessert')
+
+        payload = {
+            'title': 'Chocolate lime cheesecake',
+            'tags': [own.id, other1.id, other2.id, other1.id],
+            'time_minutes': 60,
+            'price': 20.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['tags'], [
+            f'Invalid pk "{other1.id}" - object does not exist.',
+            f'Invalid pk "{other2.id}" - object does not exist.'
+        ])
+        self.assertFalse(Recipe.objects.exists())
+
 
     def test_partial_update_recipe(self):
         #Test updating a recipe with patch
@@ -298,3 +326,272 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn(serializer1.data, res.data)
         self.assertIn(serializer2.data, res.data)
         self.assertNotIn(serializer3.data, res.data)
+
+
+class RecipeQueryCountTests(TestCase):
+    #Test that recipe endpoints run a fixed number of queries
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'queries@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _sample_recipes(self, count):
+        #Create recipes with a couple of tags and ingredients each
+        recipes = []
+        for i in range(count):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                sample_tag(user=self.user, name=f'Tag {i}'),
+                sample_tag(user=self.user, name=f'Other tag {i}')
+            )
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}'),
+                sample_ingredient(user=self.user, name=f'Other {i}')
+            )
+            recipes.append(recipe)
+
+        return recipes
+
+    def test_list_query_count(self):
+        #Test listing recipes costs one query per relation
+        self._sample_recipes(10)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 10)
+        self.assertEqual(len(res.data[0]['tags']), 2)
+        self.assertEqual(len(res.data[0]['ingredients']), 2)
+
+    def test_paginated_list_query_count(self):
+        #Test a page of recipes costs the same as the plain list
+        self._sample_recipes(10)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL, {'page_size': 5})
+
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_detail_query_count(self):
+        #Test retrieving a recipe with nested tags and ingredients
+        recipe = self._sample_recipes(1)[0]
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
+
+    def test_expanded_list_query_count(self):
+        #Test expanded relations are embedded with one query per relation
+        recipes = self._sample_recipes(10)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL, {'expand': 'tags,ingredients'})
+
+        self.assertEqual(
+            res.data[0]['tags'],
+            RecipeDetailSerializer(recipes[0]).data['tags']
+        )
+        self.assertEqual(
+            res.data[0]['ingredients'],
+            RecipeDetailSerializer(recipes[0]).data['ingredients']
+        )
+
+    def test_expand_one_relation(self):
+        #Test relations that are not expanded stay primary keys
+        recipe = self._sample_recipes(1)[0]
+
+        res = self.client.get(RECIPES_URL, {'expand': 'tags'})
+
+        self.assertEqual(res.data[0]['tags'][0].keys(), {'id', 'name'})
+        self.assertEqual(
+            sorted(res.data[0]['ingredients']),
+            sorted(recipe.ingredients.values_list('id', flat=True))
+        )
+
+    def test_expand_unknown_field(self):
+        #Test only relations can be expanded
+        res = self.client.get(RECIPES_URL, {'expand': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_list_skips_relations(self):
+        #Test ?fields= without relations loads only the listed columns
+        self._sample_recipes(10)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('"link"', ctx.captured_queries[0]['sql'])
+        self.assertEqual(set(res.data[0]), {'id', 'title'})
+
+    def test_sparse_list_prefetches_requested_relation(self):
+        #Test only the relations listed in ?fields= are prefetched
+        self._sample_recipes(10)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPES_URL, {'fields': 'title,tags'})
+
+        self.assertEqual(set(res.data[0]), {'title', 'tags'})
+        self.assertEqual(len(res.data[0]['tags']), 2)
+
+    def test_sparse_detail(self):
+        #Test ?fields= also trims the recipe detail
+        recipe = self._sample_recipes(1)[0]
+
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                detail_url(recipe.id),
+                {'fields': 'title,ingredients'}
+            )
+
+        self.assertEqual(res.data, {
+            'title': recipe.title,
+            'ingredients': RecipeDetailSerializer(recipe).data['ingredients']
+        })
+
+    def test_validate_related_query_count(self):
+        #Test submitted ids cost one query per relation, not one per id
+        tags = [sample_tag(user=self.user, name=f'Tag {i}') for i in range(5)]
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            for i in range(40)
+        ]
+        request = RequestFactory().post(RECIPES_URL)
+        request.user = self.user
+        serializer = RecipeSerializer(
+            data={
+                'title': 'Stew',
+                'tags': [tag.id for tag in tags],
+                'ingredients': [ingredient.id for ingredient in ingredients],
+                'time_minutes': 60,
+                'price': 10.00
+            },
+            context={'request': request}
+        )
+
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+
+        self.assertEqual(serializer.validated_data['ingredients'], ingredients)
+
+    def test_update_writes_only_changed_assignments(self):
+        #Test an update deletes and inserts just the changed assignments
+        recipe = sample_recipe(user=self.user)
+        tag = sample_tag(user=self.user)
+        recipe.tags.add(tag)
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            for i in range(40)
+        ]
+        recipe.ingredients.add(*ingredients)
+        saffron = sample_ingredient(user=self.user, name='Saffron')
+        through = Recipe.ingredients.through
+        kept = list(
+            through.objects.exclude(ingredient=ingredients[0])
+                           .order_by('id')
+                           .values_list('id', flat=True)
+        )
+        updated_at = recipe.updated_at
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(detail_url(recipe.id), {
+                'tags': [tag.id],
+                'ingredients': [i.id for i in ingredients[1:]] + [saffron.id]
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [
+            query['sql'].split(' ', 3)[:3] for query in ctx.captured_queries
+            if query['sql'].startswith(('INSERT', 'DELETE'))
+        ]
+        self.assertEqual(writes, [
+            ['DELETE', 'FROM', f'"{through._meta.db_table}"'],
+            ['INSERT', 'INTO', f'"{through._meta.db_table}"'],
+        ])
+        self.assertEqual(
+            list(through.objects.exclude(ingredient=saffron)
+                                .order_by('id')
+                                .values_list('id', flat=True)),
+            kept
+        )
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, updated_at)
+        res = self.client.get(RECIPES_URL, {'search': 'saffron'})
+        self.assertEqual([r['id'] for r in res.data], [recipe.id])
+
+    def test_sparse_unknown_field(self):
+        #Test unknown names in ?fields= are rejected
+        res = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeFilterTests(TestCase):
+    #Test any-of, all-of and none-of recipe filters
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'filters@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(user=self.user, name='Vegan')
+        self.quick = sample_tag(user=self.user, name='Quick')
+        self.salad = sample_recipe(user=self.user, title='Salad')
+        self.salad.tags.add(self.vegan, self.quick)
+        self.curry = sample_recipe(user=self.user, title='Curry')
+        self.curry.tags.add(self.vegan)
+        self.steak = sample_recipe(user=self.user, title='Steak')
+
+    def _titles(self, params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data]
+
+    def test_filter_any_returns_unique_recipes(self):
+        #Test matching several tags does not duplicate a recipe
+        titles = self._titles({'tags': f'{self.vegan.id},{self.quick.id}'})
+
+        self.assertEqual(titles, ['Salad', 'Curry'])
+
+    def test_filter_all_tags(self):
+        #Test recipes must have every listed tag
+        titles = self._titles(
+            {'tags__all': f'{self.vegan.id},{self.quick.id}'}
+        )
+
+        self.assertEqual(titles, ['Salad'])
+
+    def test_filter_none_tags(self):
+        #Test recipes with any of the listed tags are excluded
+        titles = self._titles({'tags__none': f'{self.quick.id}'})
+
+        self.assertEqual(titles, ['Curry', 'Steak'])
+
+    def test_filter_combined(self):
+        #Test modes and relations can be combined
+        ingredient = sample_ingredient(user=self.user, name='Rice')
+        self.curry.ingredients.add(ingredient)
+
+        titles = self._titles({
+            'tags__any': f'{self.vegan.id}',
+            'tags__none': f'{self.quick.id}',
+            'ingredients__all': f'{ingredient.id}'
+        })
+
+        self.assertEqual(titles, ['Curry'])
+
+    def test_filter_invalid_ids(self):
+        #Test ids that are not integers are rejected
+        for param in ('tags', 'tags__all', 'ingredients__none'):
+            res = self.client.get(RECIPES_URL, {param: f'{self.vegan.id},x'})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(param, res.data)
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, RequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import rows
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+class RecipeRowsTests(TestCase):
+    #Test values() rows render exactly like the recipe serializers
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'rows@djangoproject.com',
+            'testpass'
+        )
+        self.request = RequestFactory().get('/api/recipe/recipes/')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pizza',
+            time_minutes=30,
+            price=5.5,
+            link='https://example.com/pizza',
+            image='uploads/recipe/pizza.jpg',
+            image_renditions={'160': 'uploads/recipe/renditions/pizza-160.jpg'}
+        )
+        for name in ('Dinner', 'Italian'):
+            self.recipe.tags.add(Tag.objects.create(user=self.user, name=name))
+        for name in ('Cheese', 'Flour', 'Tomatoes'):
+            self.recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=name)
+            )
+        self.plain = Recipe.objects.create(
+            user=self.user,
+            title='Toast',
+            time_minutes=5,
+            price=1
+        )
+
+    def _assert_renders_like(self, serializer_class, **context):
+        context['request'] = self.request
+        recipes = Recipe.objects.order_by('id')
+        serializer = serializer_class(context=context)
+
+        self.assertEqual(
+            rows.render(
+                serializer,
+                recipes.values(*rows.columns(serializer))
+            ),
+            serializer_class(recipes, many=True, context=context).data
+        )
+
+    def test_render_list(self):
+        #Test the list rows match RecipeSerializer
+        self._assert_renders_like(RecipeSerializer)
+
+    def test_render_detail(self):
+        #Test nested relations, image and renditions match the detail
+        self._assert_renders_like(RecipeDetailSerializer)
+
+    def test_render_sparse_and_expanded(self):
+        #Test ?fields= and ?expand= are honoured like by the serializer
+        self._assert_renders_like(
+            RecipeSerializer,
+            fields=['title', 'price', 'tags'],
+            expand=('tags',)
+        )
+
+    def test_columns_follow_fields(self):
+        #Test only the columns of rendered fields are read
+        serializer = RecipeDetailSerializer(
+            context={'fields': ['title', 'renditions', 'ingredients']}
+        )
+
+        self.assertEqual(
+            rows.columns(serializer),
+            ['id', 'title', 'image_renditions']
+        )
@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from recipe.importer import import_recipes
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RecipeSearchTests(TestCase):
+    #Test full text search of recipes
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'search@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _recipe(self, title, *ingredients):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title=title,
+            time_minutes=10,
+            price=5.00
+        )
+        for name in ingredients:
+            recipe.ingredients.add(
+                Ingredient.objects.get_or_create(user=self.user, name=name)[0]
+            )
+
+        return recipe
+
+    def _search(self, terms):
+        res = self.client.get(RECIPES_URL, {'search': terms})
+        return [recipe['id'] for recipe in res.data]
+
+    def test_search_title_and_ingredients(self):
+        #Test titles and ingredient names are searched, titles rank first
+        soup = self._recipe('Tomato soup', 'Basil')
+        pasta = self._recipe('Pasta', 'Tomatoes', 'Garlic')
+        self._recipe('Pancakes', 'Flour')
+
+        self.assertEqual(self._search('tomato'), [soup.id, pasta.id])
+
+    def test_search_websearch_syntax(self):
+        #Test quoted phrases and excluded words are supported
+        soup = self._recipe('Tomato soup')
+        self._recipe('Tomato salad')
+
+        self.assertEqual(self._search('tomato -salad'), [soup.id])
+        self.assertEqual(self._search('"tomato soup"'), [soup.id])
+
+    def test_search_follows_ingredient_changes(self):
+        #Test renaming, unassigning and deleting ingredients is searchable
+        recipe = self._recipe('Stew', 'Beef')
+        beef = Ingredient.objects.get(name='Beef')
+
+        beef.name = 'Lentils'
+        beef.save()
+        self.assertEqual(self._search('lentils'), [recipe.id])
+        self.assertEqual(self._search('beef'), [])
+
+        beef.recipe_set.clear()
+        self.assertEqual(self._search('lentils'), [])
+
+        recipe.ingredients.add(beef)
+        beef.delete()
+        self.assertEqual(self._search('lentils'), [])
+
+    def test_search_follows_title_changes(self):
+        #Test updating a recipe title is searchable
+        recipe = self._recipe('Stew')
+
+        self.client.patch(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            {'title': 'Curry'}
+        )
+
+        self.assertEqual(self._search('curry'), [recipe.id])
+
+    def test_search_imported_recipes(self):
+        #Test bulk imported recipes are searchable
+        basil = Ingredient.objects.create(user=self.user, name='Basil')
+        list(import_recipes(self.user, [
+            f'{{"title": "Pesto", "time_minutes": 5, "price": "2.00", '
+            f'"ingredients": [{basil.id}]}}'.encode()
+        ]))
+
+        self.assertEqual(len(self._search('basil')), 1)
+
+    def test_search_limited_to_user(self):
+        #Test recipes of other users are not found
+        other = get_user_model().objects.create_user(
+            'other@djangoproject.com',
+            'testpass'
+        )
+        Recipe.objects.create(user=other, title='Tomato soup',
+                              time_minutes=10, price=5.00)
+
+        self.assertEqual(self._search('tomato'), [])
+
+    def test_search_results_paginated(self):
+        #Test following next walks every match once, in rank order
+        for i in range(9):
+            self._recipe(
+                'Pasta bake' if i % 3 else 'Pasta',
+                *(['Pasta'] if i % 2 else ['Cheese'])
+            )
+        expected = self._search('pasta')
+
+        res = self.client.get(RECIPES_URL, {'search': 'pasta', 'page_size': 2})
+        ids = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next'] and len(ids) <= len(expected):
+            res = self.client.get(res.data['next'])
+            ids += [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(ids, expected)
@@ -120,4 +120,133 @@ class PrivateTagsApiTests(TestCase):
         recipe2.tags.add(tag)
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
-        self.assertEqual(len(res.data), 1)
\ No newline at end of file
+        self.assertEqual(len(res.data), 1)
+
+    def _sample_recipe_with_tags(self, *tags):
+        recipe = Recipe.objects.create(
+            title='Pancakes',
+            time_minutes=5,
+            price=20.00,
+            user=self.user
+        )
+        recipe.tags.add(*tags)
+
+    def test_retrieve_tags_with_recipe_count(self):
+        #Test tags can be annotated with how many recipes use them
+        breakfast = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        self._sample_recipe_with_tags(breakfast)
+        self._sample_recipe_with_tags(breakfast)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL, {'recipe_count': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': res.data[0]['id'], 'name': 'Lunch', 'recipe_count': 0},
+            {'id': breakfast.id, 'name': 'Breakfast', 'recipe_count': 2},
+        ])
+
+    def test_retrieve_tags_popular_first(self):
+        #Test ordering tags by the number of recipes using them
+        dinner = Tag.objects.create(user=self.user, name='Dinner')
+        breakfast = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        self._sample_recipe_with_tags(dinner, breakfast)
+        self._sample_recipe_with_tags(breakfast)
+
+        res = self.client.get(
+            TAGS_URL,
+            {'ordering': 'popular', 'assigned_only': 1}
+        )
+
+        self.assertEqual(
+            [(tag['name'], tag['recipe_count']) for tag in res.data],
+            [('Breakfast', 2), ('Dinner', 1)]
+        )
+
+    def test_retrieve_tags_invalid_flag(self):
+        #Test flags that are not integers are rejected
+        for flag in ('assigned_only', 'recipe_count'):
+            res = self.client.get(TAGS_URL, {flag: 'yes'})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(flag, res.data)
+
+        res = self.client.post(
+            f'{TAGS_URL}?skip_existing=yes',
+            [{'name': 'Vegan'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('skip_existing', res.data)
+
+    def test_bulk_create_tags(self):
+        #Test creating a batch of tags from a JSON array
+        payload = [{'name': f'Tag {i}'} for i in range(50)]
+
+        #savepoint, single insert, release
+        with self.assertNumQueries(3):
+            res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 50)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 50)
+
+    def test_bulk_create_tags_invalid(self):
+        #Test one invalid tag rejects the whole batch
+        payload = [{'name': 'Vegan'}, {'name': ''}]
+
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[1]['name'][0].code, 'blank')
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+
+    def test_bulk_create_tags_skip_existing(self):
+        #Test existing names are returned instead of duplicated
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}, {'name': 'Dessert'}]
+
+        res = self.client.post(
+            f'{TAGS_URL}?skip_existing=1',
+            payload,
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data[0]['id'], vegan.id)
+        self.assertEqual(res.data[1], res.data[2])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_autocomplete_tags(self):
+        #Test prefix matches come before fuzzy matches
+        Tag.objects.create(user=self.user, name='Vegetarian')
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Low vegan')
+        Tag.objects.create(user=self.user, name='Vegetables')
+
+        res = self.client.get(reverse('recipe:tag-autocomplete'),
+                              {'q': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['name'] for tag in res.data],
+                         ['Vegan', 'Low vegan', 'Vegetarian'])
+
+    def test_autocomplete_tags_limit_and_user(self):
+        #Test suggestions are limited and only include the user's tags
+        other = get_user_model().objects.create_user(
+            'other@djangoproject.com',
+            'password123'
+        )
+        Tag.objects.create(user=other, name='Vegan')
+        for name in ('Veg 1', 'Veg 2', 'Veg 3'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(reverse('recipe:tag-autocomplete'),
+                              {'q': 've', 'limit': 2})
+
+        self.assertEqual([tag['name'] for tag in res.data],
+                         ['Veg 1', 'Veg 2'])
@@ -0,0 +1,255 @@
+import fcntl
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeImageUpload
+from recipe import uploads
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+def uploads_url(recipe_id):
+    return reverse('recipe:recipe-image-uploads', args=[recipe_id])
+
+
+def upload_url(recipe_id, upload_id):
+    return reverse('recipe:recipe-image-upload', args=[recipe_id, upload_id])
+
+
+def complete_url(recipe_id, upload_id):
+    return reverse(
+        'recipe:recipe-image-upload-complete',
+        args=[recipe_id, upload_id]
+    )
+
+
+def sample_image_bytes(size=(120, 80)):
+    #Return the content of a JPEG image
+    content = BytesIO()
+    Image.new('RGB', size, color='red').save(content, format='JPEG')
+    return content.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, FILE_UPLOAD_TEMP_DIR=MEDIA_ROOT)
+class ResumableImageUploadTests(TestCase):
+    #Test uploading recipe images in chunks
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'uploads@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pizza',
+            time_minutes=20,
+            price=10.00
+        )
+
+    def _start(self, size):
+        return self.client.post(uploads_url(self.recipe.id), {'size': size})
+
+    def _put(self, upload_id, content, start, size):
+        end = start + len(content) - 1
+        return self.client.put(
+            upload_url(self.recipe.id, upload_id),
+            content,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{size}'
+        )
+
+    def _upload(self, content):
+        upload_id = self._start(len(content)).data['id']
+        half = len(content) // 2
+        self._put(upload_id, content[:half], 0, len(content))
+        self._put(upload_id, content[half:], half, len(content))
+
+        return upload_id
+
+    def test_upload_in_chunks(self):
+        #Test chunks are joined and stored as the recipe image
+        content = sample_image_bytes()
+        upload_id = self._upload(content)
+
+        with patch('recipe.images.submit_renditions') as submit, \
+                self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(complete_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        with Image.open(self.recipe.image.path) as image:
+            self.assertEqual(image.size, (120, 80))
+        submit.assert_called_once_with(self.recipe.id)
+        self.assertFalse(RecipeImageUpload.objects.exists())
+        self.assertFalse(os.path.exists(uploads.part_path(upload_id)))
+
+    def test_resume_reports_received_bytes(self):
+        #Test the status of an upload tells where to resume
+        content = sample_image_bytes()
+        upload_id = self._start(len(content)).data['id']
+        self._put(upload_id, content[:100], 0, len(content))
+
+        res = self.client.get(upload_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.data['received'], 100)
+        self.assertEqual(res.data['size'], len(content))
+
+    def test_chunk_at_wrong_offset_conflicts(self):
+        #Test a chunk not starting at the received offset is rejected
+        content = sample_image_bytes()
+        upload_id = self._start(len(content)).data['id']
+
+        res = self._put(upload_id, content[100:200], 100, len(content))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_chunk_read_outside_transaction(self):
+        #Test no transaction is open while the chunk is read from the client
+        content = sample_image_bytes()
+        upload = RecipeImageUpload.objects.create(
+            user=self.user,
+            recipe=self.recipe,
+            size=len(content)
+        )
+        open(uploads.part_path(upload.pk), 'wb').close()
+        depth = len(connection.savepoint_ids)
+        body = BytesIO(content)
+        depths = []
+
+        def read(size):
+            depths.append(len(connection.savepoint_ids))
+            return body.read(size)
+
+        upload = uploads.append_chunk(
+            self.user,
+            self.recipe,
+            upload.pk,
+            f'bytes 0-{len(content) - 1}/{len(content)}',
+            type('Stream', (), {'read': staticmethod(read)})
+        )
+
+        self.assertEqual(set(depths), {depth})
+        upload.refresh_from_db()
+        self.assertEqual(upload.received, len(content))
+
+    def test_concurrent_chunk_conflicts(self):
+        #Test a chunk arriving while another one is received is refused
+        content = sample_image_bytes()
+        upload_id = self._start(len(content)).data['id']
+
+        with open(uploads.part_path(upload_id), 'r+b') as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            res = self._put(upload_id, content[:100], 0, len(content))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['detail'].code, 'upload_busy')
+        res = self._put(upload_id, content[:100], 0, len(content))
+        self.assertEqual(res.data['received'], 100)
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=1000)
+    def test_size_limit(self):
+        #Test uploads larger than the byte limit are refused up front
+        res = self._start(1001)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(RecipeImageUpload.objects.exists())
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=1000)
+    def test_pixel_limit(self):
+        #Test images with too many pixels are refused before decoding
+        upload_id = self._upload(sample_image_bytes((100, 100)))
+
+        with patch('PIL.Image.Image.load') as load:
+            res = self.client.post(complete_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        load.assert_not_called()
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_complete_requires_all_bytes(self):
+        #Test an incomplete upload can not be completed
+        content = sample_image_bytes()
+        upload_id = self._start(len(content)).data['id']
+        self._put(upload_id, content[:100], 0, len(content))
+
+        res = self.client.post(complete_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_of_other_user_not_found(self):
+        #Test uploads can only be continued by their owner
+        content = sample_image_bytes()
+        upload_id = self._start(len(content)).data['id']
+        other = get_user_model().objects.create_user(
+            'other@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(upload_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_discard_expired_uploads_command(self):
+        #Test abandoned uploads of every user and their files are deleted
+        live_id = self._start(100).data['id']
+        other = get_user_model().objects.create_user(
+            'other@djangoproject.com',
+            'testpass'
+        )
+        self.client.force_authenticate(other)
+        recipe = Recipe.objects.create(
+            user=other,
+            title='Soup',
+            time_minutes=20,
+            price=10.00
+        )
+        expired_id = self.client.post(
+            uploads_url(recipe.id),
+            {'size': 100}
+        ).data['id']
+        RecipeImageUpload.objects.filter(pk=expired_id).update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        orphan = uploads.part_path(uuid.uuid4())
+        open(orphan, 'wb').close()
+        old = time.time() - 2 * 24 * 60 * 60
+        os.utime(orphan, (old, old))
+
+        stdout = StringIO()
+        call_command('discard_expired_uploads', stdout=stdout)
+
+        self.assertIn('Discarded 1 expired uploads, 1 orphaned files',
+                      stdout.getvalue())
+        self.assertFalse(
+            RecipeImageUpload.objects.filter(pk=expired_id).exists()
+        )
+        self.assertFalse(os.path.exists(uploads.part_path(expired_id)))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(uploads.part_path(live_id)))
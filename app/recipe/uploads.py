@@ -0,0 +1,239 @@
+import fcntl
+import os
+import re
+import tempfile
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import exceptions, status
+
+from core.models import RecipeImageUpload
+from recipe import images
+
+
+#Bytes read from the request stream at a time
+CHUNK_READ_SIZE = 64 * 1024
+
+#Upload ids in urls, anything else can not be a UUID
+UPLOAD_ID_PATTERN = \
+    r'(?P<upload_id>[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12})'
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+PART_NAME = re.compile(rf'^recipe-image-{UPLOAD_ID_PATTERN}\.part$')
+
+
+class UploadOffsetConflict(exceptions.APIException):
+    #A chunk that does not start where the upload stopped
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Chunk does not start at the received offset.'
+    default_code = 'offset_conflict'
+
+
+class UploadBusy(exceptions.APIException):
+    #Another chunk of the upload is still being received
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Another chunk of this upload is being received.'
+    default_code = 'upload_busy'
+
+
+def _part_directory():
+    return settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir()
+
+
+def part_path(upload_id):
+    #Temporary file collecting the chunks of an upload
+    return os.path.join(_part_directory(), f'recipe-image-{upload_id}.part')
+
+
+def _remove_part(upload_id):
+    try:
+        os.remove(part_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def _lifetime():
+    return timedelta(seconds=settings.RECIPE_IMAGE_UPLOAD_LIFETIME)
+
+
+def _expired():
+    return RecipeImageUpload.objects.filter(
+        created__lt=timezone.now() - _lifetime()
+    )
+
+
+def discard_expired(user=None):
+    #Delete abandoned uploads, of the user or of everyone, and their
+    #temporary files, return the number of uploads deleted
+    uploads = _expired()
+    if user is not None:
+        uploads = uploads.filter(user=user)
+    upload_ids = list(uploads.values_list('id', flat=True))
+    RecipeImageUpload.objects.filter(id__in=upload_ids).delete()
+    for upload_id in upload_ids:
+        _remove_part(upload_id)
+
+    return len(upload_ids)
+
+
+def discard_orphaned_parts():
+    #Delete old temporary files whose upload is gone, e.g. deleted with
+    #its recipe, return the number of files deleted
+    cutoff = (timezone.now() - _lifetime()).timestamp()
+    parts = {}
+    for entry in os.scandir(_part_directory()):
+        match = PART_NAME.match(entry.name)
+        if match and entry.stat().st_mtime < cutoff:
+            parts[match.group('upload_id')] = entry.path
+
+    live = {
+        str(upload_id) for upload_id in RecipeImageUpload.objects
+        .filter(id__in=parts).values_list('id', flat=True)
+    }
+    removed = 0
+    for upload_id, path in parts.items():
+        if upload_id not in live:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+    return removed
+
+
+def get_upload(user, recipe, upload_id, lock=False):
+    #Return a live upload of the user's recipe, 404 otherwise
+    queryset = RecipeImageUpload.objects.filter(user=user, recipe=recipe) \
+                                        .exclude(pk__in=_expired())
+    if lock:
+        queryset = queryset.select_for_update()
+
+    upload = queryset.filter(pk=upload_id).first()
+    if upload is None:
+        raise exceptions.NotFound()
+
+    return upload
+
+
+def create_upload(user, recipe, size):
+    #Start an upload of size bytes, the size is checked up front
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise exceptions.ValidationError(
+            {'size': ['A valid integer is required.']}
+        )
+    if size <= 0:
+        raise exceptions.ValidationError({'size': ['Size must be positive.']})
+    try:
+        images.check_size(size)
+    except DjangoValidationError as error:
+        raise exceptions.ValidationError({'size': error.messages})
+
+    discard_expired(user)
+    upload = RecipeImageUpload.objects.create(
+        user=user,
+        recipe=recipe,
+        size=size
+    )
+    open(part_path(upload.pk), 'wb').close()
+
+    return upload
+
+
+def parse_content_range(header, upload):
+    #Return (start, length) of a "bytes start-end/size" header
+    match = CONTENT_RANGE.match(header or '')
+    if match is None:
+        raise exceptions.ValidationError(
+            {'Content-Range': ['Expected "bytes <start>-<end>/<size>".']}
+        )
+
+    start, end, size = map(int, match.groups())
+    if size != upload.size or not start <= end < size:
+        raise exceptions.ValidationError(
+            {'Content-Range': [f'Range must lie within {upload.size} bytes.']}
+        )
+
+    return start, end - start + 1
+
+
+def append_chunk(user, recipe, upload_id, content_range, stream):
+    #Stream a chunk of the request body to the upload's temporary file.
+    #Chunks of an upload are kept in order by a lock on that file, no
+    #transaction or row lock is held while the client sends the body
+    upload = get_upload(user, recipe, upload_id)
+    start, length = parse_content_range(content_range, upload)
+
+    try:
+        part = open(part_path(upload.pk), 'r+b')
+    except FileNotFoundError:
+        raise exceptions.NotFound()
+
+    with part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadBusy()
+
+        #the chunk holding the lock before may have moved the offset
+        upload = get_upload(user, recipe, upload_id)
+        if start != upload.received:
+            raise UploadOffsetConflict()
+
+        written = 0
+        part.seek(start)
+        while stream is not None and written < length:
+            chunk = stream.read(min(CHUNK_READ_SIZE, length - written))
+            if not chunk:
+                #a cut off chunk is kept, the client resumes after it
+                break
+            part.write(chunk)
+            written += len(chunk)
+        part.truncate()
+        part.flush()
+
+        #recorded before the lock is released by closing the file
+        upload.received = start + written
+        if not RecipeImageUpload.objects.filter(pk=upload.pk) \
+                                        .update(received=upload.received):
+            raise exceptions.NotFound()
+
+    return upload
+
+
+def complete_upload(user, recipe, upload_id):
+    #Check, recompress and store the uploaded file as the recipe image
+    with transaction.atomic():
+        upload = get_upload(user, recipe, upload_id, lock=True)
+        if upload.received != upload.size:
+            raise exceptions.ValidationError({'size': [
+                f'Received {upload.received} of {upload.size} bytes.'
+            ]})
+
+        with open(part_path(upload.pk), 'rb') as part:
+            try:
+                content = images.recompress(File(part, name='image'))
+            except DjangoValidationError as error:
+                raise exceptions.ValidationError({'image': error.messages})
+
+        previous = (recipe.image.name, recipe.image_renditions)
+        recipe.image.save(content.name, content, save=False)
+        #renditions of the previous image no longer apply
+        recipe.image_renditions = {}
+        recipe.save()
+        upload.delete()
+
+        if previous[0] and previous[0] != recipe.image.name:
+            images.schedule_release(*previous)
+        images.schedule_renditions(recipe)
+        transaction.on_commit(partial(_remove_part, upload_id))
+
+    return recipe
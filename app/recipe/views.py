@@ -1,78 +1,301 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+from django.http import Http404, StreamingHttpResponse
+from django.utils.http import parse_etags
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from core.models import Recipe, Tag, Ingredient
-from recipe import serializers
+from recipe import caching, export, filters, images, importer, media, \
+                   rows, search, serializers, uploads
+from recipe.pagination import RecipeCursorPagination
+from user.authentication import SignedTokenAuthentication
 
 
 class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     #Base viewset for user owned recipe attributes
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
+
+    def _query_flag(self, name):
+        #url params need to be converted
+        value = self.request.query_params.get(name, default=0)
+        try:
+            return bool(int(value))
+        except ValueError:
+            raise ValidationError({name: ['Must be 0 or 1.']})
+
+    def _with_recipe_count(self):
+        return self._query_flag('recipe_count') or \
+            self.request.query_params.get('ordering') == 'popular'
 
     def get_queryset(self):
         #Return objects for the current authenticated user only
-        #url params need to be converted
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', default=0))
-        )
-        queryset = self.queryset
+        queryset = self.queryset.filter(user=self.request.user)
+
+        if self._query_flag('assigned_only'):
+            #EXISTS instead of joining recipes, so no DISTINCT is needed
+            field = Recipe._meta.get_field(self.recipe_field)
+            queryset = queryset.filter(Exists(
+                field.remote_field.through.objects.filter(**{
+                    field.m2m_reverse_field_name(): OuterRef('pk')
+                })
+            ))
+
+        if self._with_recipe_count():
+            #counted for all objects in a single grouped query
+            queryset = queryset.annotate(recipe_count=Count('recipe'))
+
+        #id breaks ties, so equal names keep their place between pages
+        if self.request.query_params.get('ordering') == 'popular':
+            return queryset.order_by('-recipe_count', '-name', '-id')
+
+        return queryset.order_by('-name', '-id')
+
+    def get_serializer_class(self):
+        #Return serializer including recipe_count when it is annotated
+        if self.action == 'list' and self._with_recipe_count():
+            return self.count_serializer_class
+
+        return self.serializer_class
+
+    def list(self, request, *args, **kwargs):
+        #Serve lists from the per-user cache, invalidated in recipe.signals
+        #the rows are stored under the version read before the query
+        key = caching.list_cache_key(self.recipe_field, request)
+        data = caching.get_list(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        caching.set_list(key, response.data)
+
+        return response
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['skip_existing'] = self._query_flag('skip_existing')
+
+        return context
+
+    def create(self, request, *args, **kwargs):
+        #Create a new object, or a batch of them from a JSON array
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
 
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+        if len(request.data) > settings.RECIPE_BULK_CREATE_MAX:
+            raise ValidationError(
+                f'At most {settings.RECIPE_BULK_CREATE_MAX} objects '
+                'can be created at once.'
+            )
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            self.perform_create(serializer)
+        #bulk inserts send no post_save, invalidate cached lists here
+        caching.bump_user_version(self.recipe_field, request.user.pk)
 
-        return queryset.filter(
-            user=self.request.user
-            ).order_by('-name').distinct()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def perform_create(self, serializer):
         #Create a new object
         serializer.save(user=self.request.user)
 
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        #Return the top names matching ?q= by prefix or similarity
+        term = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get(
+                'limit',
+                settings.RECIPE_AUTOCOMPLETE_LIMIT
+            ))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        limit = max(1, min(limit, settings.RECIPE_AUTOCOMPLETE_MAX_LIMIT))
+
+        if not term:
+            return Response([])
+
+        queryset = search.autocomplete(
+            self.queryset.filter(user=request.user).only('id', 'name'),
+            term,
+            limit
+        )
+
+        return Response(self.serializer_class(queryset, many=True).data)
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     #Manage tags in the database
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
+    recipe_field = 'tags'
 
 class IngredeientViewSet(BaseRecipeAttrViewSet):
     #Manage ingredients in the database
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
+    recipe_field = 'ingredients'
 
 class RecipeViewSet(viewsets.ModelViewSet):
     #Manage recipes in the database
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, param, qs):
         #Convert a list of string ids to a list of ints for filtering
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            return [int(str_id) for str_id in qs.split(',')]
+        except ValueError:
+            raise ValidationError({
+                param: ['A comma separated list of ids is required.']
+            })
 
     def get_queryset(self):
         #Retrieve recipes for authenticated users
 
-        #for filtering when passing args in get
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        #for filtering when passing args in get, e.g.
+        #?tags__all=1,2&ingredients__none=3 (a bare ?tags= means any of)
         queryset = self.queryset
 
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids) #syntax for foregin key filter
+        for field_name in ('tags', 'ingredients'):
+            for mode, param in filters.relation_params(field_name):
+                ids = self.request.query_params.get(param)
+                if ids:
+                    queryset = filters.filter_related(
+                        queryset,
+                        field_name,
+                        mode,
+                        self._params_to_ints(param, ids)
+                    )
+
+        queryset = queryset.filter(user=self.request.user).order_by('id')
+
+        #?search=pasta -mushroom ranks matches by title and ingredients
+        terms = self.request.query_params.get('search')
+        if terms and self.action == 'list':
+            queryset = search.search(queryset, terms)
+
+        return queryset
+
+    def _requested_fields(self):
+        #Field names listed in ?fields=, None when every field is rendered
+        if not hasattr(self, '_fields'):
+            self._fields = None
+            param = self.request.query_params.get('fields')
+            if param and self.action in ('list', 'retrieve'):
+                names = [name.strip() for name in param.split(',')]
+                available = self.get_serializer_class()().fields
+                unknown = [name for name in names if name not in available]
+                if unknown:
+                    raise ValidationError({'fields': [
+                        f'Unknown field "{name}".' for name in unknown
+                    ]})
+                self._fields = names
+
+        return self._fields
+
+    def _expanded(self):
+        #Relations listed in ?expand= that the list renders as objects
+        if not hasattr(self, '_expand'):
+            self._expand = ()
+            param = self.request.query_params.get('expand')
+            if param and self.action == 'list':
+                names = [name.strip() for name in param.split(',')]
+                expandable = self.get_serializer_class().expandable_fields
+                unknown = [name for name in names if name not in expandable]
+                if unknown:
+                    raise ValidationError({'expand': [
+                        f'Field "{name}" can not be expanded.'
+                        for name in unknown
+                    ]})
+                self._expand = tuple(names)
+
+        return self._expand
+
+    def _not_modified(self, etag):
+        #Return a 304 response if the client already has this version
+        header = self.request.META.get('HTTP_IF_NONE_MATCH')
+        if header:
+            etags = parse_etags(header)
+            if etag in etags or '*' in etags:
+                return Response(
+                    status=status.HTTP_304_NOT_MODIFIED,
+                    headers={'ETag': etag}
+                )
+
+        return None
+
+    def list(self, request, *args, **kwargs):
+        #List recipes, versioned by the user's recipe collection
+        etag = caching.etag(
+            request,
+            caching.user_version(caching.RECIPES_SCOPE, request.user.pk)
+        )
+        not_modified = self._not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        #rendered from values() rows instead of model instances,
+        #?fields=id,title only loads the columns that are rendered
+        serializer = self.get_serializer()
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.values(
+            *rows.columns(serializer),
+            #annotated sort keys, e.g. the search rank, locate cursor pages
+            *queryset.query.annotations
+        )
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(
+                rows.render(serializer, page)
+            )
+        else:
+            response = Response(rows.render(serializer, queryset))
+        response['ETag'] = etag
+
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        #Retrieve a recipe, versioned by its updated_at
+        serializer = self.get_serializer()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            self.filter_queryset(self.get_queryset()).values(
+                'updated_at',
+                *rows.columns(serializer)
+            ),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, row)
 
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        etag = caching.etag(request, row['id'], row['updated_at'])
+        not_modified = self._not_modified(etag)
+        if not_modified:
+            return not_modified
 
-        return queryset.filter(user=self.request.user)
+        #related objects are only loaded when the body is rendered
+        return Response(
+            rows.render(serializer, [row])[0],
+            headers={'ETag': etag}
+        )
 
     def get_serializer_class(self):
         #Return appropriate serializer class
@@ -84,21 +307,72 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self._requested_fields()
+        context['expand'] = self._expanded()
+
+        return context
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
+    @action(methods=['POST'], detail=False, url_path='import',
+            renderer_classes=(export.NDJSONRenderer,))
+    def import_recipes(self, request):
+        #Import newline delimited JSON recipes streamed in the body,
+        #request.data is never touched so the upload is not buffered.
+        #The report is streamed too, one line per failed recipe line
+        #and a final {"created": ..., "failed": ...} summary
+        renderer = request.accepted_renderer
+        report = importer.import_recipes(
+            request.user,
+            importer.read_lines(request.stream)
+        )
+
+        return StreamingHttpResponse(
+            renderer.render_rows(report, None),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+
+    @action(methods=['GET'], detail=False, url_path='export',
+            renderer_classes=(export.NDJSONRenderer, export.CSVRenderer))
+    def export(self, request):
+        #Stream every recipe of the user as NDJSON or CSV (?format=csv),
+        #memory use does not depend on the number of recipes
+        renderer = request.accepted_renderer
+        rows = export.recipe_rows(
+            request.user,
+            settings.RECIPE_EXPORT_CHUNK_SIZE
+        )
+        response = StreamingHttpResponse(
+            renderer.render_rows(rows, export.EXPORT_FIELDS),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{renderer.format}"'
+
+        return response
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         #Upload an image to a recipe
         recipe = self.get_object()
+        previous = (recipe.image.name, recipe.image_renditions)
         serializer = self.get_serializer(
             recipe,
             data=request.data
         )
 
         if serializer.is_valid():
-            serializer.save()
+            #the file and the reference to it are committed together
+            with transaction.atomic():
+                #renditions of the previous image no longer apply
+                serializer.save(image_renditions={})
+                if previous[0] and previous[0] != recipe.image.name:
+                    images.schedule_release(*previous)
+                images.schedule_renditions(recipe)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -109,4 +383,85 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-        
\ No newline at end of file
+    def _upload_status(self, upload):
+        return {
+            'id': upload.id,
+            'size': upload.size,
+            'received': upload.received,
+        }
+
+    @action(methods=['POST'], detail=True, url_path='image-uploads')
+    def image_uploads(self, request, pk=None):
+        #Start a resumable image upload of a declared size
+        upload = uploads.create_upload(
+            request.user,
+            self.get_object(),
+            request.data.get('size')
+        )
+
+        return Response(
+            self._upload_status(upload),
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(methods=['GET', 'PUT'], detail=True,
+            url_path=f'image-uploads/{uploads.UPLOAD_ID_PATTERN}',
+            url_name='image-upload')
+    def image_upload(self, request, pk=None, upload_id=None):
+        #Report how much of an upload was received or append a chunk,
+        #the chunk is streamed from the body as described by Content-Range
+        recipe = self.get_object()
+        if request.method == 'GET':
+            upload = uploads.get_upload(request.user, recipe, upload_id)
+        else:
+            upload = uploads.append_chunk(
+                request.user,
+                recipe,
+                upload_id,
+                request.headers.get('Content-Range'),
+                request.stream
+            )
+
+        return Response(
+            self._upload_status(upload),
+            status=status.HTTP_200_OK
+        )
+
+    @action(methods=['POST'], detail=True,
+            url_path=f'image-uploads/{uploads.UPLOAD_ID_PATTERN}/complete',
+            url_name='image-upload-complete')
+    def complete_image_upload(self, request, pk=None, upload_id=None):
+        #Store a fully received upload as the recipe image
+        recipe = uploads.complete_upload(
+            request.user,
+            self.get_object(),
+            upload_id
+        )
+
+        return Response(
+            serializers.RecipeImageSerializer(
+                recipe,
+                context=self.get_serializer_context()
+            ).data,
+            status=status.HTTP_200_OK
+        )
+
+
+class RecipeMediaView(APIView):
+    #Serve recipe images and renditions to the owner of the recipe
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def perform_content_negotiation(self, request, force=False):
+        #the body is a file, do not reject clients accepting only images
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, name):
+        if not media.owned_by(request.user, name):
+            raise Http404()
+
+        return media.serve(
+            request,
+            Recipe._meta.get_field('image').storage,
+            name
+        )
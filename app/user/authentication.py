@@ -0,0 +1,59 @@
+import hashlib
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from user import tokens
+
+
+def token_cache_key(key):
+    #Keys are hashed so raw tokens never end up in the cache
+    return 'user:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    #Token authentication remembering resolved users for a short time
+    #Entries are dropped in user.signals when a token is deleted or
+    #its user changes, e.g. is deactivated
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        credentials = cache.get(cache_key)
+
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            cache.set(
+                cache_key,
+                credentials,
+                settings.AUTH_TOKEN_CACHE_TIMEOUT
+            )
+
+        return credentials
+
+
+class SignedTokenAuthentication(CachedTokenAuthentication):
+    #Accepts signed access tokens next to the opaque database tokens,
+    #signatures are checked in-process and users come from the cache
+
+    def authenticate_credentials(self, key):
+        if not tokens.is_signed_token(key):
+            return super().authenticate_credentials(key)
+
+        try:
+            user_id = tokens.verify_access_token(key)
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid or expired token.')
+            )
+
+        user = tokens.get_cached_user(user_id)
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return (user, key)
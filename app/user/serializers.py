@@ -3,6 +3,8 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from user.tokens import rotate_refresh_token
+
 
 class UserSerializer(serializers.ModelSerializer):
     #Serializer for users object
@@ -59,3 +61,18 @@ class AuthTokenSerializer(serializers.Serializer):
         return attrs
 
 
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField(trim_whitespace=False)
+
+    def validate(self, attrs):
+        #Exchange the refresh token, it can only be used once
+        user, refresh = rotate_refresh_token(attrs.get('refresh'))
+        if not user:
+            msg = _('Invalid or expired refresh token')
+            raise serializers.ValidationError(msg, code='authentication')
+
+        attrs['user'] = user
+        attrs['refresh'] = refresh
+
+        return attrs
+
@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache_key
+from user.tokens import user_cache_key
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    #Revoke a deleted token right away instead of after the cache TTL
+    cache.delete(token_cache_key(instance.key))
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, **kwargs):
+    #Drop cached credentials so deactivation and profile changes apply
+    if not created:
+        cache.delete_many([user_cache_key(instance.pk)] + [
+            token_cache_key(key) for key in
+            Token.objects.filter(user=instance).values_list('key', flat=True)
+        ])
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    #Signed access tokens of a deleted user must stop resolving
+    cache.delete(user_cache_key(instance.pk))
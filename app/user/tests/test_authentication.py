@@ -0,0 +1,162 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+ME_URL = reverse('user:me')
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    #Test token authentication backed by the cache
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@djangoproject.com',
+            password='testpass',
+            name='Test'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_resolved_from_cache(self):
+        #Test only the first request looks the token up
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token_rejected(self):
+        #Test unknown tokens are still rejected
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_revoked(self):
+        #Test a deleted token stops working before the cache expires
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_revoked(self):
+        #Test a deactivated user's token stops working right away
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_not_stale(self):
+        #Test the cached user reflects profile updates
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New name')
+
+
+@override_settings(AUTH_SIGNED_TOKENS=True)
+class SignedTokenTests(TestCase):
+    #Test signed access tokens and database refresh tokens
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='signed@djangoproject.com',
+            password='testpass',
+            name='Test'
+        )
+        self.client = APIClient()
+        self.tokens = self.client.post(
+            TOKEN_URL,
+            {'email': 'signed@djangoproject.com', 'password': 'testpass'}
+        ).data
+
+    def _me(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        return self.client.get(ME_URL)
+
+    def test_token_endpoint_issues_signed_tokens(self):
+        #Test the token endpoint returns access and refresh tokens
+        self.assertIn('access', self.tokens)
+        self.assertIn('refresh', self.tokens)
+        self.assertNotIn('token', self.tokens)
+
+    def test_access_token_verified_without_queries(self):
+        #Test access tokens authenticate without database lookups
+        self._me(self.tokens['access'])
+
+        with self.assertNumQueries(0):
+            res = self._me(self.tokens['access'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_tampered_access_token_rejected(self):
+        #Test access tokens with a bad signature are rejected
+        res = self._me(self.tokens['access'][:-1] + 'x')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_access_token_rejected(self):
+        #Test access tokens stop working after their lifetime
+        later = time.time() + 3600
+        with patch('django.core.signing.time.time', return_value=later):
+            res = self._me(self.tokens['access'])
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_access_token_rejected(self):
+        #Test access tokens of deactivated users are rejected
+        self._me(self.tokens['access'])
+        self.user.is_active = False
+        self.user.save()
+
+        res = self._me(self.tokens['access'])
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_rotated(self):
+        #Test a refresh token can be exchanged exactly once
+        res = self.client.post(REFRESH_URL, {'refresh': self.tokens['refresh']})
+        reused = self.client.post(
+            REFRESH_URL,
+            {'refresh': self.tokens['refresh']}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['refresh'], self.tokens['refresh'])
+        self.assertEqual(self._me(res.data['access']).status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(reused.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_opaque_tokens_still_accepted(self):
+        #Test database tokens keep working next to signed ones
+        token = Token.objects.create(user=self.user)
+
+        res = self._me(token.key)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,90 @@
+import hashlib
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import RefreshToken
+
+
+ACCESS_TOKEN_SALT = 'user.tokens.access'
+
+
+def is_signed_token(key):
+    #Opaque database tokens are plain hex, signed ones contain separators
+    return ':' in key
+
+
+def issue_access_token(user):
+    #Return a short lived token that is verified without the database
+    return signing.dumps({'uid': user.pk}, salt=ACCESS_TOKEN_SALT)
+
+
+def verify_access_token(key):
+    #Return the user id of a valid access token, raise BadSignature
+    #(or its SignatureExpired subclass) otherwise
+    payload = signing.loads(
+        key,
+        salt=ACCESS_TOKEN_SALT,
+        max_age=settings.AUTH_ACCESS_TOKEN_LIFETIME
+    )
+
+    return payload['uid']
+
+
+def _digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def issue_refresh_token(user):
+    #Store a new refresh token for the user and return its key
+    key = secrets.token_urlsafe(32)
+    RefreshToken.objects.create(
+        user=user,
+        key_digest=_digest(key),
+        expires_at=timezone.now() + timedelta(
+            seconds=settings.AUTH_REFRESH_TOKEN_LIFETIME
+        )
+    )
+
+    return key
+
+
+def rotate_refresh_token(key):
+    #Exchange a refresh token for a new one, return (user, new key)
+    #or (None, None) when the token is unknown, expired or inactive
+    with transaction.atomic():
+        token = RefreshToken.objects.select_for_update() \
+            .select_related('user') \
+            .filter(key_digest=_digest(key)) \
+            .first()
+        if token is None:
+            return None, None
+
+        token.delete()
+        if token.expires_at <= timezone.now() or not token.user.is_active:
+            return None, None
+
+        return token.user, issue_refresh_token(token.user)
+
+
+def user_cache_key(user_id):
+    return f'user:id:{user_id}'
+
+
+def get_cached_user(user_id):
+    #Return the user for a verified access token, from the cache if possible
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+
+    if user is None:
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(key, user, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+    return user
@@ -1,8 +1,22 @@
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from user.serializers import UserSerializer, AuthTokenSerializer
+from user import tokens
+from user.authentication import SignedTokenAuthentication
+from user.serializers import UserSerializer, AuthTokenSerializer, \
+                             RefreshTokenSerializer
+
+
+def signed_tokens_response(user, refresh):
+    #Response body with a new access token and the refresh token
+    return Response({
+        'access': tokens.issue_access_token(user),
+        'refresh': refresh,
+        'expires_in': settings.AUTH_ACCESS_TOKEN_LIFETIME
+    })
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -14,10 +28,35 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        #Issue signed access and refresh tokens when enabled
+        if not settings.AUTH_SIGNED_TOKENS:
+            return super().post(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+
+        return signed_tokens_response(user, tokens.issue_refresh_token(user))
+
+class RefreshTokenView(ObtainAuthToken):
+    #Exchange a refresh token for a new access and refresh token
+    serializer_class = RefreshTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return signed_tokens_response(
+            serializer.validated_data['user'],
+            serializer.validated_data['refresh']
+        )
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     #Manage authenticated user
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):